@@ -12,24 +12,53 @@ Este script:
 
 import os
 import json
+import heapq
 import logging
-from datetime import datetime
-from typing import Dict, List, Any
+from datetime import datetime, date
+from graphlib import TopologicalSorter, CycleError
+from itertools import islice
+from typing import Dict, List, Any, NamedTuple, FrozenSet, Iterator, Tuple
 import xmlrpc.client
 import socket
 
 
+class TimeoutTransport(xmlrpc.client.Transport):
+    """Transport XML-RPC que aplica el timeout en cada conexión HTTP"""
+    
+    def __init__(self, timeout, **kwargs):
+        self._timeout = timeout
+        super().__init__(**kwargs)
+    
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self._timeout
+        return conn
+
+
+class TimeoutSafeTransport(xmlrpc.client.SafeTransport):
+    """SafeTransport (HTTPS) que aplica el timeout en cada conexión HTTP"""
+    
+    def __init__(self, timeout, **kwargs):
+        self._timeout = timeout
+        super().__init__(**kwargs)
+    
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self._timeout
+        return conn
+
+
 class TimeoutServerProxy(xmlrpc.client.ServerProxy):
     """ServerProxy con timeout configurable para evitar bloqueos"""
     
     def __init__(self, uri, timeout=300, **kwargs):
         self._timeout = timeout
+        # El timeout va en el socket de la conexión, no en socket.setdefaulttimeout(),
+        # así no depende de señales ni de estado global y es seguro entre threads
+        if 'transport' not in kwargs:
+            transport_class = TimeoutSafeTransport if uri.startswith('https') else TimeoutTransport
+            kwargs['transport'] = transport_class(timeout, use_datetime=kwargs.get('use_datetime', False))
         super().__init__(uri, **kwargs)
-    
-    def __getattr__(self, name):
-        # Establecer timeout antes de cada llamada
-        socket.setdefaulttimeout(self._timeout)
-        return super().__getattr__(name)
 
 
 def setup_logging(log_dir: str = 'logs'):
@@ -94,6 +123,192 @@ def setup_logging(log_dir: str = 'logs'):
 logger, log_file, debug_file, error_file = setup_logging()
 
 
+# Tipos de campo cuyo valor nunca es texto: vacío solo si es None/False (sin strip())
+_NON_TEXT_FIELD_TYPES = frozenset({'many2one', 'integer', 'float', 'monetary', 'boolean'})
+
+
+def _is_empty(value, field_type: str = None) -> bool:
+    """
+    Un valor está vacío si es None, False o una cadena en blanco (0 y [] NO son vacíos).
+    Si se indica field_type y no es de texto, solo se comprueba None/False.
+    """
+    if value is None or value is False:
+        return True
+    if field_type in _NON_TEXT_FIELD_TYPES:
+        return False
+    return type(value) is str and not value.strip()
+
+
+def _unpack_m2o(value) -> tuple:
+    """
+    Normaliza un valor many2one exportado de v13 en una sola pasada.
+    
+    Args:
+        value: [id, name], [id], un ID (int/str) u otro valor (False/None)
+    
+    Returns:
+        Tupla (id, name); los elementos ausentes son None
+    """
+    if isinstance(value, (list, tuple)):
+        return (value[0] if value else None, value[1] if len(value) > 1 else None)
+    if isinstance(value, (int, str)):
+        return (value, None)
+    return (None, None)
+
+
+def _extract_v13_id(value):
+    """
+    Extrae el ID v13 de un many2one (int/str o [id, name]) como int para buscar en los mapeos.
+    
+    Args:
+        value: Valor many2one exportado de v13
+    
+    Returns:
+        ID v13 como int, o None si el valor está vacío o no es un ID
+    """
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if type(value) is int:
+        return value or None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _parse_iso_date(value):
+    """
+    Convierte una fecha exportada de v13 a date.
+    
+    Args:
+        value: 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS', date, datetime u otro valor (False/None)
+    
+    Returns:
+        date, o False si el valor está vacío o no es una fecha válida
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return False
+    return False
+
+
+def _int_keys(mapping: Dict) -> Dict[int, Any]:
+    """
+    Convierte las claves de un mapeo {v13_id_str: valor} (como viene de JSON o de
+    migration.tracking) a int, para buscar directamente con el ID v13 sin str().
+    
+    Args:
+        mapping: Diccionario con IDs v13 como claves (str o int)
+    
+    Returns:
+        Diccionario {v13_id: valor}; las claves que no son IDs se descartan
+    """
+    result = {}
+    for key, value in mapping.items():
+        try:
+            result[int(key)] = value
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+# Valores por defecto de campos selection requeridos en v18 sin valor en v13: (modelo, campo) -> valor
+_SELECTION_DEFAULTS = {
+    ('product.template', 'service_tracking'): 'no',
+    ('product.template', 'purchase_line_warn'): 'no-message',
+    ('product.template', 'sale_line_warn'): 'no-message',
+    ('product.product', 'service_tracking'): 'no',
+    ('product.product', 'purchase_line_warn'): 'no-message',
+    ('product.product', 'sale_line_warn'): 'no-message',
+}
+
+# product.pricelist.item: applied_on (v13) -> display_applied_on (v18); '1_product' por defecto
+_DISPLAY_APPLIED_ON_MAP = {
+    '1_product': '1_product',
+    '2_product_category': '2_product_category',
+    '0_product_variant': '1_product',  # Product variant -> Product
+    '3_global': '1_product',  # Global -> Product (por defecto)
+}
+
+# Modelos de producto (comparten uom_id, etiqueta OLDv13 y valores por defecto) y campos de unidad de medida
+_PRODUCT_MODELS = frozenset({'product.template', 'product.product'})
+_UOM_FIELDS = frozenset({'uom_id', 'uom_po_id'})
+
+# Prefijo que se agrega al nombre de los productos migrados (la marca sin espacio evita duplicarlo)
+_OLDV13_MARK = 'OLDV13:'
+_OLDV13_PREFIX = _OLDV13_MARK + ' '
+
+# Máximo de registros de migration.tracking que se leen por modelo al obtener su mapeo
+_MAPPING_LIMIT = 100000
+
+# Máximo de detalles de many2one no mapeados que se guardan por modelo en el diagnóstico
+# (el total se cuenta siempre; solo se conservan los primeros para no crecer sin límite)
+_UNMAPPED_SAMPLE_SIZE = 100
+
+# Opciones de json.dumps para los archivos de exportación (registros y M2M): sin indent
+# para que se use el codificador en C de la librería estándar (indent fuerza el de Python)
+_EXPORT_JSON_KWARGS = {'separators': (',', ':'), 'ensure_ascii': False, 'default': str}
+
+# Centinela para dict.get/dict.pop cuando False o None son valores válidos del registro
+_MISS = object()
+
+# Valores booleanos que pueden llegar como texto en los JSON exportados
+_BOOL_STRINGS = {'false': False, 'False': False, 'true': True, 'True': True}
+
+# Valores por defecto de campos requeridos vacíos en la verificación final:
+# (modelo, campo) -> (proveedor(script) -> valor, descripción para el log)
+_REQUIRED_DEFAULTS = {
+    # res.company no está en models_to_migrate.txt, pero company_id es requerido en v18
+    ('res.users', 'company_id'): (lambda script: script._get_default_company_id(), 'compañía por defecto (res.company no migrado)'),
+    ('product.template', 'uom_id'): (lambda script: 1, 'unidad por defecto: 1 (Units)'),
+    ('product.product', 'uom_id'): (lambda script: 1, 'unidad por defecto: 1 (Units)'),
+    ('uom.uom', 'category_id'): (lambda script: 1, 'categoría por defecto: 1 (Unit)'),
+}
+
+# Campos v13 renombrados en v18, aplicados tras procesar todos los campos:
+# modelo v18 -> [(campo_v13, campo_v18, condición sobre el valor o None)]
+_FIELD_RENAMES = {
+    # contract.line -> sale.subscription.line
+    'sale.subscription.line': [
+        ('quantity', 'product_uom_qty', None),
+        ('specific_price', 'price_unit', lambda value: value is not None and value is not False),
+    ],
+}
+
+# Campos many2one requeridos en v18 que map_many2one_ids mapea aunque el modelo relacionado
+# no esté en models_list: (modelo, campo) -> modelo relacionado cuyo mapeo se usa
+_SPECIAL_M2O_RELATIONS = {
+    ('sale.subscription', 'partner_id'): 'res.partner',
+    ('sale.subscription', 'company_id'): 'res.company',
+    ('sale.subscription', 'pricelist_id'): 'product.pricelist',
+}
+
+
+class PreparedRecord(NamedTuple):
+    """Registro preparado para create() en v18 (tupla inmutable, sin __dict__ por instancia)"""
+    record: Dict[str, Any]
+    m2m_fields: Dict[str, List[int]]  # Se aplican después con write [(6, 0, ids)]
+    v13_id: Any
+    uom_name_changes: List[Dict] = ()  # Cambios de nombre de uom a registrar en migration.tracking
+
+
+class FieldsMeta(NamedTuple):
+    """Clasificación de campos v18 de un modelo, calculada una sola vez por modelo"""
+    valid_field_names: FrozenSet[str]
+    readonly_fields: FrozenSet[str]
+    computed_fields: FrozenSet[str]
+    no_store_fields: FrozenSet[str]
+    required_fields: FrozenSet[str]
+    field_type_map: Dict[str, str]
+    drop_fields: FrozenSet[str]  # readonly | computed | sin store | many2many: se omiten en create()
+    create_required_fields: Tuple[str, ...]  # Requeridos con store (los que se verifican antes de create())
+
+
 class OdooConnection:
     """Clase para manejar conexiones XML-RPC con Odoo"""
     
@@ -674,9 +889,7 @@ class OdooConnection:
                 v13_id = v13_ids_to_create[idx] if idx < len(v13_ids_to_create) else 'Unknown'
                 
                 # Verificar si name está vacío, None, False, o solo espacios
-                is_name_empty = (name_value is None or 
-                               name_value is False or 
-                               (isinstance(name_value, str) and not name_value.strip()))
+                is_name_empty = _is_empty(name_value)
                 
                 if is_name_empty:
                     # Forzar asignación de name
@@ -926,10 +1139,12 @@ class OdooConnection:
                 'migration.tracking',
                 [['model_name', '=', model_name], ['status', 'in', ['created', 'skipped']]],
                 ['v13_id', 'v18_id', 'status'],
-                limit=100000
+                limit=_MAPPING_LIMIT
             )
             
             logger.debug(f"[GET_MAPPING] Encontrados {len(tracking_records)} registros en migration.tracking para {model_name}")
+            if len(tracking_records) >= _MAPPING_LIMIT:
+                logger.warning(f"[GET_MAPPING] ⚠ {model_name} alcanzó el límite de {_MAPPING_LIMIT} registros: el mapeo puede estar incompleto")
             
             mapping = {}
             incomplete_count = 0
@@ -952,7 +1167,7 @@ class OdooConnection:
                 logger.debug(f"[GET_MAPPING] Mapeos completos: {mapping}")
             elif len(mapping) > 10:
                 # Mostrar solo los primeros 5 si son muchos
-                sample = dict(list(mapping.items())[:5])
+                sample = dict(islice(mapping.items(), 5))
                 logger.debug(f"[GET_MAPPING] Muestra de mapeos (primeros 5 de {len(mapping)}): {sample}...")
             
             return mapping
@@ -962,6 +1177,58 @@ class OdooConnection:
             logger.debug(f"[GET_MAPPING] Traceback: {traceback.format_exc()}")
             return {}
     
+    def get_migration_mappings(self, model_names: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Obtiene los mapeos v13 -> v18 de varios modelos consultando migration.tracking
+        a la vez (páginas de _MAPPING_LIMIT ordenadas por id en lugar de una consulta
+        por modelo). Cada modelo conserva su propio límite de _MAPPING_LIMIT registros.
+        
+        Args:
+            model_names: Nombres de los modelos
+        
+        Returns:
+            Diccionario {model_name: {v13_id_str: v18_id}} ({} por modelo si hubo error)
+        """
+        mappings = {model_name: {} for model_name in model_names}
+        if not model_names:
+            return mappings
+        read_counts = dict.fromkeys(mappings, 0)
+        pending = set(mappings)  # Modelos que aún no alcanzaron su límite
+        last_id = 0
+        try:
+            while pending:
+                # Paginación por id: los modelos que llegan a su límite salen del dominio
+                tracking_records = self.search_read(
+                    'migration.tracking',
+                    [['model_name', 'in', sorted(pending)], ['status', 'in', ['created', 'skipped']],
+                     ['id', '>', last_id]],
+                    ['model_name', 'v13_id', 'v18_id'],
+                    limit=_MAPPING_LIMIT,
+                    order='id'
+                )
+                for record in tracking_records:
+                    model_name = record.get('model_name')
+                    if model_name not in pending:
+                        continue
+                    read_counts[model_name] += 1
+                    if read_counts[model_name] >= _MAPPING_LIMIT:
+                        pending.discard(model_name)
+                        logger.warning(f"[GET_MAPPING] ⚠ {model_name} alcanzó el límite de {_MAPPING_LIMIT} registros: el mapeo puede estar incompleto")
+                    v13_id = record.get('v13_id')
+                    v18_id = record.get('v18_id')
+                    if v13_id is not None and v18_id is not None:
+                        mappings[model_name][str(v13_id)] = v18_id
+                if len(tracking_records) < _MAPPING_LIMIT:
+                    break
+                last_id = tracking_records[-1]['id']
+            logger.info("[GET_MAPPING] ✓ Mapeos obtenidos: %s",
+                        ', '.join(f"{name}={len(mapping)}" for name, mapping in mappings.items()))
+        except Exception as e:
+            logger.error(f"[GET_MAPPING] ✗ Error obteniendo mapeos para {', '.join(model_names)}: {e}")
+            # No devolver mapeos parciales (una página leída y otra no)
+            mappings = {model_name: {} for model_name in model_names}
+        return mappings
+    
     def count_migration_tracking(self, model_name: str, domain: List = None) -> int:
         """
         Cuenta registros en migration.tracking para un modelo.
@@ -1004,6 +1271,7 @@ class MigrationScript:
         self.batch_size = 100
         self.test_mode = False
         self.field_mappings = self.load_field_mappings()
+        self.compiled_field_mappings = self.compile_field_mappings(self.field_mappings)
         self.m2m_fields_config = self.load_m2m_fields_config()
         self.m2o_fields_by_name = self.load_m2o_fields_by_name()
         self.model_name_mapping = self.load_model_name_mapping()
@@ -1011,10 +1279,26 @@ class MigrationScript:
         # Cargar mapeos de currency, uom y uom.category
         self.currency_mapping = self.load_currency_mapping()
         self.uom_mapping = self.load_uom_mapping()
+        # Sub-diccionarios del mapeo de uom, extraídos una sola vez (se consultan por registro)
+        self._uom_mapping_dict = self.uom_mapping.get('mapping', {})
+        self._uom_name_change_map = self.uom_mapping.get('name_changes', {})
         self.uom_category_mapping = self.load_uom_category_mapping()
         self.subscription_template_mapping = self.load_subscription_template_mapping()
         self.pricelist_mapping = {}  # Se carga dinámicamente cuando se necesite
         self.oldv13_tag_id = None  # Se carga dinámicamente cuando se necesite
+        self._fields_cache: Dict[tuple, Dict] = {}  # (url, db, modelo) -> fields_get
+        self._fields_meta_cache: Dict[str, FieldsMeta] = {}  # modelo v18 -> FieldsMeta
+        self._m2o_name_cache: Dict[tuple, int] = {}  # búsquedas many2one por nombre ya resueltas
+        self._m2o_name_cache_hits = 0
+        self._default_company_id = None  # Se carga la primera vez que se necesita (ver _get_default_company_id)
+        self._default_pricelist = None  # Ídem para contratos sin pricelist_id (ver _get_default_pricelist)
+        self._defaults_loaded = False  # Ver _prefetch_defaults
+        # Diagnósticos de map_many2one_ids acumulados en memoria (ver _flush_mapping_diagnostics)
+        self._pending_mapping_stats: Dict[str, Dict] = {}
+        self._pending_unmapped_details: Dict[str, List[Dict]] = {}  # Muestra (ver _UNMAPPED_SAMPLE_SIZE)
+        self._pending_unmapped_counts: Dict[str, int] = {}  # Total de no mapeados por modelo
+        self._run_started = datetime.now().isoformat()  # Identifica la ejecución en los diagnósticos
+        self._mapping_cache: Dict[str, Dict[int, int]] = {}  # Mapeos de migration.tracking por modelo (ver _get_cached_mapping)
         
         # Crear directorio de errores
         os.makedirs(self.errors_dir, exist_ok=True)
@@ -1116,6 +1400,31 @@ class MigrationScript:
             logger.warning(f"⚠ No se pudieron cargar mapeos de campos desde {mappings_file}: {e}")
             return {}
     
+    def compile_field_mappings(self, field_mappings: Dict[str, Dict[str, Dict[str, str]]]) -> Dict[str, Dict[str, tuple]]:
+        """
+        Preprocesa los mapeos de campos una sola vez: separa los valores a mapear
+        de las claves especiales 'description' y 'default'.
+        
+        Args:
+            field_mappings: Mapeos tal como se cargan de field_mappings.json
+        
+        Returns:
+            Diccionario {modelo: {campo: (valores, tiene_default, default)}}.
+            Los campos que solo tienen 'description' se omiten.
+        """
+        compiled = {}
+        for model, fields in field_mappings.items():
+            if not isinstance(fields, dict):
+                continue
+            for field_name, mapping in fields.items():
+                if not isinstance(mapping, dict):
+                    continue
+                values = {k: v for k, v in mapping.items() if k not in ('description', 'default')}
+                has_default = 'default' in mapping
+                if values or has_default:
+                    compiled.setdefault(model, {})[field_name] = (values, has_default, mapping.get('default'))
+        return compiled
+    
     def load_m2m_fields_config(self) -> Dict[str, List[str]]:
         """
         Carga configuración de campos many2many permitidos desde exceptions/m2m_fields.json
@@ -1194,12 +1503,12 @@ class MigrationScript:
             logger.warning(f"⚠ Error cargando mapeo de nombres de modelos: {e}")
             return {'v13_to_v18': {}, 'v18_to_v13': {}}
     
-    def load_currency_mapping(self) -> Dict[str, int]:
+    def load_currency_mapping(self) -> Dict[int, int]:
         """
         Carga el mapeo de monedas desde currency_mapping.json
         
         Returns:
-            Diccionario {v13_id_str: v18_id}
+            Diccionario {v13_id: v18_id}
         """
         mapping_file = 'currency_mapping.json'
         try:
@@ -1208,7 +1517,7 @@ class MigrationScript:
                     data = json.load(f)
                     mapping = data.get('mapping', {})
                     logger.info(f"✓ Mapeo de monedas cargado: {len(mapping)} mapeos")
-                    return mapping
+                    return _int_keys(mapping)
             else:
                 logger.debug(f"No se encontró archivo de mapeo de monedas: {mapping_file}")
                 return {}
@@ -1221,7 +1530,7 @@ class MigrationScript:
         Carga el mapeo de unidades de medida desde uom_mapping.json
         
         Returns:
-            Diccionario con 'mapping' {v13_id_str: v18_id} y 'name_changes' para registrar cambios
+            Diccionario con 'mapping' {v13_id: v18_id} y 'name_changes' {v13_id: info} para registrar cambios
         """
         mapping_file = 'uom_mapping.json'
         try:
@@ -1232,11 +1541,11 @@ class MigrationScript:
                     # Identificar cambios de nombre
                     name_changes = {}
                     for match in data.get('matches_by_id', []):
-                        v13_id = str(match.get('id'))
+                        v13_id = match.get('id')
                         v13_name = match.get('v13_name', '')
                         v18_name = match.get('v18_name', '')
-                        if v13_name != v18_name and v13_name and v18_name:
-                            name_changes[v13_id] = {
+                        if v13_name != v18_name and v13_name and v18_name and v13_id:
+                            name_changes[int(v13_id)] = {
                                 'v13_name': v13_name,
                                 'v18_name': v18_name,
                                 'v18_id': match.get('id')  # Si coincide por ID, el ID es el mismo
@@ -1244,7 +1553,7 @@ class MigrationScript:
                     
                     logger.info(f"✓ Mapeo de unidades de medida cargado: {len(mapping)} mapeos, {len(name_changes)} cambios de nombre")
                     return {
-                        'mapping': mapping,
+                        'mapping': _int_keys(mapping),
                         'name_changes': name_changes
                     }
             else:
@@ -1254,12 +1563,12 @@ class MigrationScript:
             logger.warning(f"⚠ Error cargando mapeo de unidades de medida: {e}")
             return {'mapping': {}, 'name_changes': {}}
     
-    def load_uom_category_mapping(self) -> Dict[str, int]:
+    def load_uom_category_mapping(self) -> Dict[int, int]:
         """
         Carga el mapeo de categorías de unidades de medida desde uom_category_mapping.json
         
         Returns:
-            Diccionario {v13_id_str: v18_id}
+            Diccionario {v13_id: v18_id}
         """
         mapping_file = 'uom_category_mapping.json'
         try:
@@ -1268,7 +1577,7 @@ class MigrationScript:
                     data = json.load(f)
                     mapping = data.get('mapping', {})
                     logger.info(f"✓ Mapeo de categorías UoM cargado: {len(mapping)} mapeos")
-                    return mapping
+                    return _int_keys(mapping)
             else:
                 logger.debug(f"No se encontró archivo de mapeo de categorías UoM: {mapping_file}")
                 return {}
@@ -1657,6 +1966,12 @@ class MigrationScript:
         # Esto es necesario para poder mapear las líneas a sus suscripciones
         force_include_contract_id = (v18_model_name == 'sale.subscription.line' or model == 'contract.line')
         
+        # Invariantes del modelo: se evalúan una sola vez fuera del bucle de campos
+        is_res_users = (model == 'res.users')
+        is_product_product = (model == 'product.product')
+        # frozenset para pertenencia O(1); None si no hay lista (no se filtra)
+        models_set = frozenset(models_list) if models_list else None
+        
         try:
             fields_info = conn.get_fields(model)
             stored_fields = []
@@ -1683,7 +1998,7 @@ class MigrationScript:
                 if field_type == 'many2many':
                     # Verificar que el modelo relacionado esté en la lista de modelos a migrar
                     relation = field_info.get('relation', '')
-                    if models_list and relation not in models_list:
+                    if models_set is not None and relation not in models_set:
                         logger.debug(f"  Excluyendo campo many2many '{field_name}' -> '{relation}' (no está en models_to_migrate.txt)")
                         continue
                     # Incluir el campo many2many
@@ -1696,7 +2011,7 @@ class MigrationScript:
                 if field_type == 'many2one':
                     # parent_id es especial: siempre se incluye si el modelo está en models_list
                     if field_name == 'parent_id':
-                        if models_list and model in models_list:
+                        if models_set is not None and model in models_set:
                             stored_fields.append(field_name)
                             logger.debug("  Incluyendo campo especial 'parent_id' (apunta al mismo modelo)")
                             continue
@@ -1785,7 +2100,7 @@ class MigrationScript:
                     
                     # Verificar que el modelo relacionado esté en la lista de modelos a migrar
                     relation = field_info.get('relation', '')
-                    if models_list and relation not in models_list:
+                    if models_set is not None and relation not in models_set:
                         logger.info(f"  ⚠ Excluyendo campo many2one '{field_name}' -> '{relation}' (no está en models_to_migrate.txt)")
                         continue
                 
@@ -1796,7 +2111,7 @@ class MigrationScript:
                 store = field_info.get('store', True)
                 if store is False:
                     # Excepción para 'name' en res.users
-                    if field_name == 'name' and model == 'res.users':
+                    if is_res_users and field_name == 'name':
                         stored_fields.append(field_name)
                         logger.debug("  Incluyendo campo especial 'name' en res.users (aunque sea computed)")
                         continue
@@ -1805,7 +2120,7 @@ class MigrationScript:
                 
                 # Excluir campos de imagen para product.product (causan problemas con XML-RPC por tamaño)
                 # Estos campos se pueden migrar después si es necesario
-                if model == 'product.product' and field_name.startswith('image_'):
+                if is_product_product and field_name.startswith('image_'):
                     logger.debug(f"  Excluyendo campo de imagen '{field_name}' en {model} (causa problemas con XML-RPC)")
                     continue
                 
@@ -1836,23 +2151,11 @@ class MigrationScript:
             Lista de modelos de los que depende este modelo
         """
         dependencies = []
+        models_set = frozenset(models_list)
         try:
-            # Agregar timeout para evitar que se quede pegado
-            import signal
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError(f"Timeout obteniendo campos de {model}")
-            
-            # Solo aplicar timeout en Linux/Unix
-            if hasattr(signal, 'SIGALRM'):
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(10)  # 10 segundos de timeout
-            
-            try:
-                fields_info = conn.get_fields(model)
-            finally:
-                if hasattr(signal, 'SIGALRM'):
-                    signal.alarm(0)  # Cancelar timeout
+            # El timeout lo aplica el transport XML-RPC de la conexión (TimeoutServerProxy);
+            # get_fields ya registra el error y devuelve {} (sin dependencias)
+            fields_info = conn.get_fields(model)
             
             for field_name, field_info in fields_info.items():
                 field_type = field_info.get('type', '')
@@ -1860,13 +2163,13 @@ class MigrationScript:
                 if field_type == 'many2one':
                     relation = field_info.get('relation', '')
                     # Solo incluir si el modelo relacionado está en la lista de modelos a migrar
-                    if relation and relation in models_list:
+                    if relation and relation in models_set:
                         if relation not in dependencies:
                             dependencies.append(relation)
             
             return dependencies
-        except (TimeoutError, Exception) as e:
-            logger.warning(f"⚠ No se pudieron obtener dependencias de {model}: {e}")
+        except Exception as e:
+            logger.warning("⚠ No se pudieron obtener dependencias de %s: %s", model, e)
             return []
     
     def sort_models_by_dependencies(self, models_config: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -1889,103 +2192,96 @@ class MigrationScript:
             model = model_config['model']
             allow_many2one = model_config.get('allow_many2one', False)
             
-            # Inicializar lista de dependencias
-            dependencies[model] = []
+            # Inicializar dependencias como dict ordenado {dep: None} (altas/bajas O(1), sin duplicados)
+            dependencies[model] = {}
             
             if allow_many2one:
                 try:
                     deps = self.get_many2one_dependencies(model, self.v13_conn, model_names)
-                    dependencies[model].extend(deps)
+                    dependencies[model].update(dict.fromkeys(deps))
                 except Exception as e:
-                    logger.warning(f"⚠ Error obteniendo dependencias para {model}: {e}, continuando sin dependencias")
+                    logger.warning("⚠ Error obteniendo dependencias para %s: %s, continuando sin dependencias", model, e)
             
             # DEPENDENCIAS EXPLÍCITAS: Agregar dependencias conocidas aunque no estén en many2one
             # uom.uom depende de uom.category (category_id es requerido)
             if model == 'uom.uom' and 'uom.category' in model_names:
-                if 'uom.category' not in dependencies[model]:
-                    dependencies[model].append('uom.category')
-                    logger.debug(f"[DEPENDENCIAS] Agregada dependencia explícita: {model} -> uom.category")
+                dependencies[model]['uom.category'] = None
+                logger.debug("[DEPENDENCIAS] Agregada dependencia explícita: %s -> uom.category", model)
             
             # product.template depende de product.category y uom.uom (uom_id es requerido)
             # IMPORTANTE: product.template NO debe depender de product.product (es al revés)
             if model == 'product.template':
                 # Limpiar dependencias incorrectas detectadas automáticamente
-                if 'product.product' in dependencies[model]:
-                    dependencies[model].remove('product.product')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia incorrecta product.product de {model}")
+                if dependencies[model].pop('product.product', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia incorrecta product.product de %s", model)
                 # Agregar dependencias explícitas correctas
-                if 'product.category' in model_names and 'product.category' not in dependencies[model]:
-                    dependencies[model].append('product.category')
-                if 'uom.uom' in model_names and 'uom.uom' not in dependencies[model]:
-                    dependencies[model].append('uom.uom')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'product.category' in model_names:
+                    dependencies[model]['product.category'] = None
+                if 'uom.uom' in model_names:
+                    dependencies[model]['uom.uom'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # product.product depende de product.template (product_tmpl_id es requerido)
             # IMPORTANTE: product.product SIEMPRE debe migrarse DESPUÉS de product.template
             if model == 'product.product':
                 # Limpiar dependencias circulares incorrectas
-                if 'product.product' in dependencies[model]:
-                    dependencies[model].remove('product.product')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular product.product de {model}")
+                if dependencies[model].pop('product.product', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular product.product de %s", model)
                 # Agregar dependencia explícita correcta
-                if 'product.template' in model_names and 'product.template' not in dependencies[model]:
-                    dependencies[model].append('product.template')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'product.template' in model_names:
+                    dependencies[model]['product.template'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # product.pricelist depende de res.currency (currency_id es requerido)
             if model == 'product.pricelist':
-                if 'res.currency' in model_names and 'res.currency' not in dependencies[model]:
-                    dependencies[model].append('res.currency')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'res.currency' in model_names:
+                    dependencies[model]['res.currency'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # product.pricelist.item depende de product.pricelist, product.template, product.product, product.category
             if model == 'product.pricelist.item':
-                if 'product.pricelist' in model_names and 'product.pricelist' not in dependencies[model]:
-                    dependencies[model].append('product.pricelist')
-                if 'product.template' in model_names and 'product.template' not in dependencies[model]:
-                    dependencies[model].append('product.template')
-                if 'product.product' in model_names and 'product.product' not in dependencies[model]:
-                    dependencies[model].append('product.product')
-                if 'product.category' in model_names and 'product.category' not in dependencies[model]:
-                    dependencies[model].append('product.category')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'product.pricelist' in model_names:
+                    dependencies[model]['product.pricelist'] = None
+                if 'product.template' in model_names:
+                    dependencies[model]['product.template'] = None
+                if 'product.product' in model_names:
+                    dependencies[model]['product.product'] = None
+                if 'product.category' in model_names:
+                    dependencies[model]['product.category'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # sale.subscription depende de res.partner, product.pricelist (template_id se crea antes)
             if model == 'sale.subscription':
-                if 'res.partner' in model_names and 'res.partner' not in dependencies[model]:
-                    dependencies[model].append('res.partner')
-                if 'product.pricelist' in model_names and 'product.pricelist' not in dependencies[model]:
-                    dependencies[model].append('product.pricelist')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'res.partner' in model_names:
+                    dependencies[model]['res.partner'] = None
+                if 'product.pricelist' in model_names:
+                    dependencies[model]['product.pricelist'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # sale.subscription.line depende de sale.subscription y product.product
             if model == 'sale.subscription.line':
-                if 'sale.subscription' in model_names and 'sale.subscription' not in dependencies[model]:
-                    dependencies[model].append('sale.subscription')
-                if 'product.product' in model_names and 'product.product' not in dependencies[model]:
-                    dependencies[model].append('product.product')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'sale.subscription' in model_names:
+                    dependencies[model]['sale.subscription'] = None
+                if 'product.product' in model_names:
+                    dependencies[model]['product.product'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # res.partner NO depende de res.users
             # IMPORTANTE: user_id en res.partner se establece a False si no hay mapeo, NO requiere res.users
             # res.partner se migra PRIMERO, luego res.users puede crear partners automáticamente si no existen
             if model == 'res.partner':
                 # Eliminar dependencia de res.users - res.partner puede crearse sin user_id
-                if 'res.users' in dependencies[model]:
-                    dependencies[model].remove('res.users')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia de res.users de {model} (user_id se establece a False si no hay mapeo)")
+                if dependencies[model].pop('res.users', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia de res.users de %s (user_id se establece a False si no hay mapeo)", model)
                 # Limpiar dependencias circulares incorrectas
-                if 'res.partner' in dependencies[model]:
-                    dependencies[model].remove('res.partner')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular res.partner de {model}")
+                if dependencies[model].pop('res.partner', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular res.partner de %s", model)
                 # Limpiar dependencias circulares con crm.team y product.pricelist
-                if 'crm.team' in dependencies[model]:
-                    dependencies[model].remove('crm.team')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular crm.team de {model}")
-                if 'product.pricelist' in dependencies[model]:
-                    dependencies[model].remove('product.pricelist')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular product.pricelist de {model}")
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if dependencies[model].pop('crm.team', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular crm.team de %s", model)
+                if dependencies[model].pop('product.pricelist', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular product.pricelist de %s", model)
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # res.users depende de res.partner (partner_id apunta a res.partner)
             # IMPORTANTE: res.partner se migra PRIMERO, luego res.users puede crear partners automáticamente si no existen
@@ -1993,107 +2289,91 @@ class MigrationScript:
             if model == 'res.users':
                 # Mantener dependencia de res.partner - res.users necesita partners
                 # Si res.partner está en models_list, mantener la dependencia
-                if 'res.partner' in model_names and 'res.partner' not in dependencies[model]:
-                    dependencies[model].append('res.partner')
-                    logger.debug(f"[DEPENDENCIAS] Agregada dependencia explícita: {model} -> res.partner (res.partner se migra primero)")
+                if 'res.partner' in model_names:
+                    dependencies[model]['res.partner'] = None
+                    logger.debug("[DEPENDENCIAS] Agregada dependencia explícita: %s -> res.partner (res.partner se migra primero)", model)
                 # Limpiar dependencias circulares con crm.team y product.pricelist
                 # Estos modelos pueden tener campos que apuntan a res.users, pero res.users debe migrarse después de res.partner
-                if 'crm.team' in dependencies[model]:
-                    dependencies[model].remove('crm.team')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular crm.team de {model}")
-                if 'product.pricelist' in dependencies[model]:
-                    dependencies[model].remove('product.pricelist')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular product.pricelist de {model}")
+                if dependencies[model].pop('crm.team', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular crm.team de %s", model)
+                if dependencies[model].pop('product.pricelist', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular product.pricelist de %s", model)
                 # Limpiar dependencia circular consigo mismo
-                if 'res.users' in dependencies[model]:
-                    dependencies[model].remove('res.users')
-                    logger.debug(f"[DEPENDENCIAS] Removida dependencia circular res.users de {model}")
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if dependencies[model].pop('res.users', False) is None:
+                    logger.debug("[DEPENDENCIAS] Removida dependencia circular res.users de %s", model)
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
             
             # crm.lead depende de res.partner, crm.team, crm.stage
             if model == 'crm.lead':
-                if 'res.partner' in model_names and 'res.partner' not in dependencies[model]:
-                    dependencies[model].append('res.partner')
-                if 'crm.team' in model_names and 'crm.team' not in dependencies[model]:
-                    dependencies[model].append('crm.team')
-                if 'crm.stage' in model_names and 'crm.stage' not in dependencies[model]:
-                    dependencies[model].append('crm.stage')
-                logger.debug(f"[DEPENDENCIAS] Dependencias explícitas para {model}: {dependencies[model]}")
+                if 'res.partner' in model_names:
+                    dependencies[model]['res.partner'] = None
+                if 'crm.team' in model_names:
+                    dependencies[model]['crm.team'] = None
+                if 'crm.stage' in model_names:
+                    dependencies[model]['crm.stage'] = None
+                logger.debug("[DEPENDENCIAS] Dependencias explícitas para %s: %s", model, list(dependencies[model]))
         
         # Log de dependencias antes del ordenamiento
         logger.debug("[DEPENDENCIAS] Dependencias detectadas:")
         for model, deps in dependencies.items():
             if deps:
-                logger.debug(f"  {model} -> {deps}")
-        
-        # Topological sort
-        sorted_models = []
-        visited = set()
-        temp_visited = set()
-        
-        def visit(model):
-            if model in temp_visited:
-                logger.warning(f"⚠ Dependencia circular detectada para {model}")
-                # En caso de dependencia circular, simplemente retornar sin agregar
-                # El modelo se agregará cuando se procese desde otro camino
-                return
-            if model in visited:
-                return
-            
-            temp_visited.add(model)
-            
-            # Procesar dependencias en orden
-            for dep in dependencies.get(model, []):
-                if dep in model_config_map:
-                    visit(dep)
-                else:
-                    logger.debug(f"[DEPENDENCIAS] Dependencia {dep} de {model} no está en models_config, omitiendo")
-            
-            temp_visited.remove(model)
-            visited.add(model)
-            sorted_models.append(model_config_map[model])
+                logger.debug("  %s -> %s", model, list(deps))
         
-        # Procesar modelos en orden, asegurando que los modelos sin dependencias se procesen primero
-        # Ordenar modelos por número de dependencias (menos dependencias primero)
+        # Topological sort con graphlib.TopologicalSorter
+        # Insertar los modelos ordenados por número de dependencias (menos dependencias primero)
+        # para conservar el desempate: los modelos sin dependencias se procesan primero
         models_by_dep_count = sorted(
             models_config,
             key=lambda m: len(dependencies.get(m['model'], []))
         )
         
+        graph = {}
         for model_config in models_by_dep_count:
             model = model_config['model']
-            if model not in visited:
-                visit(model)
-        
-        # Si hay modelos que no se agregaron (por dependencias circulares), agregarlos al final
-        for model_config in models_config:
-            model = model_config['model']
-            if model not in visited:
-                logger.warning(f"⚠ Modelo {model} no se agregó durante el ordenamiento topológico, agregándolo al final")
-                sorted_models.append(model_config)
+            graph[model] = []
+            for dep in dependencies.get(model, []):
+                if dep in model_config_map:
+                    graph[model].append(dep)
+                else:
+                    logger.debug("[DEPENDENCIAS] Dependencia %s de %s no está en models_config, omitiendo", dep, model)
         
-        logger.info(f"✓ Modelos ordenados por dependencias ({len(sorted_models)} modelos):")
+        while True:
+            try:
+                sorted_names = list(TopologicalSorter(graph).static_order())
+                break
+            except CycleError as e:
+                # e.args[1] = [n0, n1, ..., n0], cada nodo es dependencia del siguiente
+                cycle = e.args[1]
+                logger.warning("⚠ Dependencia circular detectada: %s", ' -> '.join(cycle))
+                # Romper el ciclo eliminando la última arista y reintentar
+                graph[cycle[-1]].remove(cycle[-2])
+        
+        sorted_models = [model_config_map[model] for model in sorted_names]
+        
+        logger.info("✓ Modelos ordenados por dependencias (%s modelos):", len(sorted_models))
         for i, m in enumerate(sorted_models, 1):
             deps = dependencies.get(m['model'], [])
             deps_str = f" (depende de: {', '.join(deps)})" if deps else " (sin dependencias)"
-            logger.info(f"  {i:2d}. {m['model']}{deps_str}")
+            logger.info("  %2d. %s%s", i, m['model'], deps_str)
         
         return sorted_models
     
     def get_many2one_fields_info(self, model: str, conn: OdooConnection) -> Dict[str, str]:
         """
         Obtiene información de campos many2one y su modelo relacionado.
+        fields_get se lee de la caché por conexión y modelo (ver _get_fields_cached),
+        así que map_many2one_ids no repite la consulta en cada batch.
         
         Args:
             model: Nombre del modelo
             conn: Conexión Odoo
         
         Returns:
-            Diccionario {field_name: relation_model}
+            Diccionario {field_name: relation_model} (nuevo en cada llamada; el llamador puede modificarlo)
         """
         many2one_fields = {}
         try:
-            fields_info = conn.get_fields(model)
+            fields_info = self._get_fields_cached(model, conn)
             
             for field_name, field_info in fields_info.items():
                 field_type = field_info.get('type', '')
@@ -2111,6 +2391,52 @@ class MigrationScript:
                                      search_value: str, create_if_not_exists: bool = False,
                                      additional_data: Dict[str, Any] = None) -> int:
         """
+        Versión memoizada de _find_or_create_m2o_by_name_uncached.
+        En un batch es habitual que muchos registros compartan el mismo valor
+        (ej: todos los partners del mismo país), así que solo el primero hace RPC.
+        Solo se cachean resultados encontrados/creados (los fallos se reintentan).
+        
+        Args:
+            relation_model: Nombre del modelo relacionado
+            search_field: Campo por el cual buscar (normalmente 'name')
+            search_value: Valor a buscar
+            create_if_not_exists: Si True, crea el registro si no existe
+            additional_data: Datos adicionales para usar al crear el registro
+        
+        Returns:
+            ID del registro encontrado o creado, o False si no se encontró/creó
+        """
+        if not search_value or not isinstance(search_value, str):
+            return False
+        
+        try:
+            extra_key = tuple(sorted(additional_data.items())) if additional_data else ()
+            cache_key = (relation_model, search_field, search_value, create_if_not_exists, extra_key)
+            hash(cache_key)
+        except TypeError:
+            # additional_data con valores no hasheables: no cachear
+            return self._find_or_create_m2o_by_name_uncached(
+                relation_model, search_field, search_value, create_if_not_exists, additional_data
+            )
+        
+        cached_id = self._m2o_name_cache.get(cache_key)
+        if cached_id:
+            self._m2o_name_cache_hits += 1
+            logger.debug("[M2O BY NAME] Caché: %s.%s='%s' -> %s (aciertos acumulados: %d)",
+                         relation_model, search_field, search_value, cached_id, self._m2o_name_cache_hits)
+            return cached_id
+        
+        found_id = self._find_or_create_m2o_by_name_uncached(
+            relation_model, search_field, search_value, create_if_not_exists, additional_data
+        )
+        if found_id:
+            self._m2o_name_cache[cache_key] = found_id
+        return found_id
+    
+    def _find_or_create_m2o_by_name_uncached(self, relation_model: str, search_field: str, 
+                                             search_value: str, create_if_not_exists: bool = False,
+                                             additional_data: Dict[str, Any] = None) -> int:
+        """
         Busca un registro en un modelo relacionado por nombre. Si no existe y create_if_not_exists=True, lo crea.
         
         Args:
@@ -2148,96 +2474,27 @@ class MigrationScript:
                 code_match = re.search(r'\(([A-Z0-9\-]+)\)', search_value)
                 if code_match:
                     state_code = code_match.group(1)
-                    # Buscar por código, pero necesitamos country_id también
-                    if additional_data and 'country_id' in additional_data:
-                        country_id = additional_data['country_id']
-                        code_domain = [['code', '=', state_code], ['country_id', '=', country_id]]
-                        code_found_ids = self.v18_conn.models.execute_kw(
-                            self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                            relation_model, 'search',
-                            [code_domain],
-                            {'limit': 1}
-                        )
-                        if code_found_ids:
-                            logger.info(f"[M2O BY NAME] Encontrado estado por código '{state_code}' para país {country_id}, ID: {code_found_ids[0]}")
-                            return code_found_ids[0]
-                    else:
-                        # Si no hay country_id en additional_data, buscar solo por código
-                        # (puede haber duplicados entre países, pero es mejor que fallar)
-                        code_domain = [['code', '=', state_code]]
-                        code_found_ids = self.v18_conn.models.execute_kw(
-                            self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                            relation_model, 'search',
-                            [code_domain],
-                            {'limit': 1}
-                        )
-                        if code_found_ids:
-                            logger.info(f"[M2O BY NAME] Encontrado estado por código '{state_code}' (sin country_id), ID: {code_found_ids[0]}")
-                            return code_found_ids[0]
+                    # Buscar por código y país; si no hay country_id en additional_data, buscar solo por código
+                    # (puede haber duplicados entre países, pero es mejor que fallar)
+                    country_id = additional_data.get('country_id') if additional_data else None
+                    state_id = self._search_state_by_code(state_code, country_id)
+                    if state_id:
+                        if country_id:
+                            logger.info(f"[M2O BY NAME] Encontrado estado por código '{state_code}' para país {country_id}, ID: {state_id}")
+                        else:
+                            logger.info(f"[M2O BY NAME] Encontrado estado por código '{state_code}' (sin country_id), ID: {state_id}")
+                        return state_id
             
             # Si no existe y create_if_not_exists=True, crear el registro
             if create_if_not_exists:
                 logger.info(f"[M2O BY NAME] Creando registro en {relation_model} con {search_field}='{search_value}'")
                 try:
-                    # Obtener campos requeridos del modelo relacionado
-                    relation_fields = self.v18_conn.get_fields(relation_model)
-                    create_data = {search_field: search_value}
-                    
-                    # Agregar campos requeridos adicionales
-                    for field_name, field_info in relation_fields.items():
-                        if field_info.get('required', False) and field_name != search_field:
-                            field_type = field_info.get('type', '')
-                            
-                            # Intentar obtener valor desde additional_data
-                            if additional_data and field_name in additional_data:
-                                create_data[field_name] = additional_data[field_name]
-                                logger.debug(f"[M2O BY NAME] Usando {field_name}={additional_data[field_name]} desde additional_data")
-                            elif field_type == 'many2one':
-                                # Para campos many2one requeridos, intentar buscar por nombre si está en additional_data
-                                relation = field_info.get('relation', '')
-                                if additional_data and f"{field_name}_name" in additional_data:
-                                    # Buscar el registro relacionado por nombre
-                                    related_name = additional_data[f"{field_name}_name"]
-                                    related_id = self._find_or_create_m2o_by_name(
-                                        relation, 'name', related_name, create_if_not_exists=True,
-                                        additional_data=additional_data
-                                    )
-                                    if related_id:
-                                        create_data[field_name] = related_id
-                                    else:
-                                        logger.warning(f"[M2O BY NAME] ⚠ No se pudo obtener {field_name} para {relation_model}, omitiendo creación")
-                                        return False
-                                # Para res.country.state, si no hay country_id en additional_data, buscar país por defecto
-                                elif relation_model == 'res.country.state' and field_name == 'country_id':
-                                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} no encontrado en additional_data para {relation_model}, buscando país por defecto")
-                                    # Buscar país España (ES) como fallback
-                                    country_domain = [['code', '=', 'ES']]
-                                    country_ids = self.v18_conn.models.execute_kw(
-                                        self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                                        'res.country', 'search',
-                                        [country_domain],
-                                        {'limit': 1}
-                                    )
-                                    if country_ids:
-                                        create_data[field_name] = country_ids[0]
-                                        logger.info(f"[M2O BY NAME] Usando país por defecto (ES) con ID: {country_ids[0]}")
-                                    else:
-                                        logger.error(f"[M2O BY NAME] ✗ No se encontró país por defecto (ES) para crear estado '{search_value}'")
-                                        return False
-                                else:
-                                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} no encontrado en additional_data para {relation_model}")
-                                    return False
-                            else:
-                                # Para otros tipos, usar valor por defecto según el tipo
-                                if field_type in ['integer', 'float']:
-                                    create_data[field_name] = 0
-                                elif field_type == 'boolean':
-                                    create_data[field_name] = False
-                                elif field_type in ['char', 'text']:
-                                    create_data[field_name] = ""
-                                else:
-                                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} de tipo {field_type} sin valor por defecto para {relation_model}")
-                                    return False
+                    # Resolver primero todos los campos requeridos (búsquedas agrupadas) y luego crear
+                    create_data = self._resolve_required_m2o_tree(
+                        relation_model, search_field, search_value, additional_data
+                    )
+                    if create_data is None:
+                        return False
                     
                     logger.debug(f"[M2O BY NAME] Datos de creación para {relation_model}: {create_data}")
                     
@@ -2257,25 +2514,11 @@ class MigrationScript:
                             # Intentar buscar el estado por código
                             if 'code' in create_data:
                                 state_code = create_data['code']
-                                country_id = create_data.get('country_id')
+                                state_id = self._search_state_by_code(state_code, create_data.get('country_id'))
                                 
-                                if country_id:
-                                    # Buscar por código y país
-                                    code_domain = [['code', '=', state_code], ['country_id', '=', country_id]]
-                                else:
-                                    # Buscar solo por código
-                                    code_domain = [['code', '=', state_code]]
-                                
-                                existing_ids = self.v18_conn.models.execute_kw(
-                                    self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                                    relation_model, 'search',
-                                    [code_domain],
-                                    {'limit': 1}
-                                )
-                                
-                                if existing_ids:
-                                    logger.info(f"[M2O BY NAME] ✓ Estado encontrado por código '{state_code}' (ya existía), ID: {existing_ids[0]}")
-                                    return existing_ids[0]
+                                if state_id:
+                                    logger.info(f"[M2O BY NAME] ✓ Estado encontrado por código '{state_code}' (ya existía), ID: {state_id}")
+                                    return state_id
                                 else:
                                     logger.error(f"[M2O BY NAME] ✗ Error indica que el código existe pero no se encontró: {create_error}")
                                     return False
@@ -2291,6 +2534,314 @@ class MigrationScript:
             logger.warning(f"[M2O BY NAME] ⚠ Error buscando en {relation_model} con {search_field}='{search_value}': {e}")
             return False
     
+    def _resolve_required_m2o_tree(self, relation_model: str, search_field: str,
+                                   search_value: str, additional_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Construye los datos de creación de un registro many2one resolviendo sus campos requeridos en dos pasadas.
+        
+        Pasada 1: recorre los campos requeridos del modelo y recoge los many2one que deben
+        buscarse por nombre ({field_name}_name en additional_data).
+        Pasada 2: resuelve esas búsquedas con un search_read por modelo relacionado; solo los
+        nombres que no existen se crean (de abajo hacia arriba) vía _find_or_create_m2o_by_name.
+        
+        Args:
+            relation_model: Modelo en el que se va a crear el registro
+            search_field: Campo por el cual se buscó (normalmente 'name')
+            search_value: Valor del campo de búsqueda
+            additional_data: Datos adicionales (valores directos o {field_name}_name para many2one)
+        
+        Returns:
+            Diccionario con los datos de creación, o None si falta algún campo requerido
+        """
+        relation_fields = self._get_fields_cached(relation_model)
+        create_data = {search_field: search_value}
+        # {field_name: (relation, related_name)} de los many2one requeridos a resolver por nombre
+        m2o_probes = {}
+        
+        for field_name, field_info in relation_fields.items():
+            if not field_info.get('required', False) or field_name == search_field:
+                continue
+            field_type = field_info.get('type', '')
+            
+            # Intentar obtener valor desde additional_data
+            if additional_data and field_name in additional_data:
+                create_data[field_name] = additional_data[field_name]
+                logger.debug(f"[M2O BY NAME] Usando {field_name}={additional_data[field_name]} desde additional_data")
+            elif field_type == 'many2one':
+                # Para campos many2one requeridos, buscar por nombre si está en additional_data
+                relation = field_info.get('relation', '')
+                if additional_data and f"{field_name}_name" in additional_data:
+                    m2o_probes[field_name] = (relation, additional_data[f"{field_name}_name"])
+                # Para res.country.state, si no hay country_id en additional_data, buscar país por defecto
+                elif relation_model == 'res.country.state' and field_name == 'country_id':
+                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} no encontrado en additional_data para {relation_model}, buscando país por defecto")
+                    # Buscar país España (ES) como fallback
+                    country_ids = self.v18_conn.models.execute_kw(
+                        self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
+                        'res.country', 'search',
+                        [[['code', '=', 'ES']]],
+                        {'limit': 1}
+                    )
+                    if country_ids:
+                        create_data[field_name] = country_ids[0]
+                        logger.info(f"[M2O BY NAME] Usando país por defecto (ES) con ID: {country_ids[0]}")
+                    else:
+                        logger.error(f"[M2O BY NAME] ✗ No se encontró país por defecto (ES) para crear estado '{search_value}'")
+                        return None
+                else:
+                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} no encontrado en additional_data para {relation_model}")
+                    return None
+            else:
+                # Para otros tipos, usar valor por defecto según el tipo
+                if field_type in ['integer', 'float']:
+                    create_data[field_name] = 0
+                elif field_type == 'boolean':
+                    create_data[field_name] = False
+                elif field_type in ['char', 'text']:
+                    create_data[field_name] = ""
+                else:
+                    logger.warning(f"[M2O BY NAME] ⚠ Campo requerido {field_name} de tipo {field_type} sin valor por defecto para {relation_model}")
+                    return None
+        
+        if not m2o_probes:
+            return create_data
+        
+        # Pasada 2: una búsqueda por modelo relacionado para todos sus nombres
+        names_by_relation = {}
+        for relation, related_name in m2o_probes.values():
+            names_by_relation.setdefault(relation, set()).add(related_name)
+        
+        found_by_relation = {}
+        for relation, names in names_by_relation.items():
+            found = self.v18_conn.search_read(relation, [['name', 'in', list(names)]], ['id', 'name'])
+            found_by_relation[relation] = {}
+            for rec in found:
+                # Conservar el primero encontrado (mismo criterio que search con limit=1)
+                found_by_relation[relation].setdefault(rec['name'], rec['id'])
+        
+        for field_name, (relation, related_name) in m2o_probes.items():
+            related_id = found_by_relation[relation].get(related_name)
+            if not related_id:
+                # No existe: crearlo (resuelve a su vez sus propios campos requeridos)
+                related_id = self._find_or_create_m2o_by_name(
+                    relation, 'name', related_name, create_if_not_exists=True,
+                    additional_data=additional_data
+                )
+                if related_id:
+                    found_by_relation[relation][related_name] = related_id
+            if related_id:
+                create_data[field_name] = related_id
+            else:
+                logger.warning(f"[M2O BY NAME] ⚠ No se pudo obtener {field_name} para {relation_model}, omitiendo creación")
+                return None
+        
+        return create_data
+    
+    def _search_state_by_code(self, state_code: str, country_id: int = None) -> int:
+        """
+        Busca un estado (res.country.state) en v18 por código, opcionalmente filtrando por país.
+        
+        Args:
+            state_code: Código del estado
+            country_id: ID del país en v18 (opcional)
+        
+        Returns:
+            ID del estado encontrado, o False si no existe
+        """
+        domain = [['code', '=', state_code]]
+        if country_id:
+            domain.append(['country_id', '=', country_id])
+        states = self.v18_conn.search_read('res.country.state', domain, ['id'], limit=1)
+        return states[0]['id'] if states else False
+    
+    def _get_default_company_id(self) -> int:
+        """
+        Obtiene la compañía principal de v18 (la de menor ID) para campos company_id
+        requeridos sin valor. Se consulta una sola vez y se reutiliza en toda la migración.
+        
+        Returns:
+            ID de la compañía por defecto, o False si no hay compañías o falló la búsqueda
+        """
+        if self._default_company_id is None:
+            try:
+                companies = self.v18_conn.search_read('res.company', [], ['id'], limit=1, order='id asc')
+            except Exception as e:
+                # No cachear errores: se reintentará en la próxima llamada
+                logger.warning(f"⚠ Error buscando compañía por defecto en v18: {e}")
+                return False
+            self._default_company_id = companies[0]['id'] if companies else False
+            logger.debug(f"Compañía por defecto en v18: {self._default_company_id}")
+        return self._default_company_id
+    
+    def _get_default_pricelist(self) -> Dict:
+        """
+        Obtiene la lista de precios por defecto de v18 (la de menor ID) para contratos sin
+        pricelist_id. Se consulta una sola vez y se reutiliza en toda la migración.
+        Si la búsqueda falla, la excepción se propaga y no se cachea (se reintentará).
+        
+        Returns:
+            Diccionario con 'id' y 'name' del pricelist, o {} si no hay ninguno
+        """
+        if self._default_pricelist is None:
+            pricelists = self.v18_conn.search_read('product.pricelist', [], ['id', 'name'], limit=1, order='id asc')
+            self._default_pricelist = pricelists[0] if pricelists else {}
+            logger.debug(f"Pricelist por defecto en v18: {self._default_pricelist}")
+        return self._default_pricelist
+    
+    def _prefetch_defaults(self):
+        """
+        Precarga, una sola vez por migración, los valores por defecto que se usan para
+        campos requeridos sin valor: la compañía por defecto, y verifica que existan
+        la unidad (uom.uom ID=1) y la categoría (uom.category ID=1) que se asignan fijas.
+        """
+        if self._defaults_loaded:
+            return
+        self._defaults_loaded = True
+        
+        self._get_default_company_id()
+        for default_model in ('uom.uom', 'uom.category'):
+            try:
+                if not self.v18_conn.search_read(default_model, [['id', '=', 1]], ['id'], limit=1):
+                    logger.warning(f"⚠ {default_model} ID=1 no existe en v18; los valores por defecto que lo usan fallarán al crear")
+            except Exception as e:
+                logger.warning(f"⚠ No se pudo verificar {default_model} ID=1 en v18: {e}")
+    
+    def _get_fields_cached(self, model: str, conn: OdooConnection = None) -> Dict[str, Any]:
+        """
+        Obtiene fields_get de un modelo, memoizado por conexión y modelo.
+        El esquema no cambia durante la migración, así que se evita un
+        round trip XML-RPC por batch.
+        
+        Args:
+            model: Nombre del modelo
+            conn: Conexión Odoo (por defecto v18)
+        
+        Returns:
+            Diccionario de campos (vacío si no se pudo obtener)
+        """
+        conn = conn or self.v18_conn
+        key = (conn.url, conn.db, model)
+        fields_info = self._fields_cache.get(key)
+        if fields_info is None:
+            fields_info = conn.get_fields(model)
+            # No cachear respuestas vacías (get_fields retorna {} ante errores)
+            if fields_info:
+                self._fields_cache[key] = fields_info
+        return fields_info
+    
+    def invalidate_fields_cache(self, model: str = None):
+        """
+        Invalida la caché de fields_get (de un modelo o completa).
+        
+        Args:
+            model: Nombre del modelo, o None para vaciar toda la caché
+        """
+        if model is None:
+            self._fields_cache.clear()
+            self._fields_meta_cache.clear()
+            return
+        for key in [k for k in self._fields_cache if k[2] == model]:
+            del self._fields_cache[key]
+        self._fields_meta_cache.pop(model, None)
+    
+    def _get_cached_mapping(self, model: str) -> Dict[int, int]:
+        """
+        Obtiene el mapeo v13 -> v18 de un modelo desde migration.tracking, memoizado.
+        La caché se vacía al inicio de cada _migrate_batches_with_mapping y el mapeo del
+        modelo que se está migrando se descarta antes de cada batch (crece con cada batch
+        creado); el resto de modelos relacionados se consulta una sola vez por migración.
+        
+        Args:
+            model: Nombre del modelo
+        
+        Returns:
+            Diccionario {v13_id: v18_id} (claves int, convertidas una sola vez al cargar)
+        """
+        mapping = self._mapping_cache.get(model)
+        if mapping is None:
+            mapping = _int_keys(self.v18_conn.get_migration_mapping(model))
+            # No memoizar mapeos vacíos: pueden deberse a un error de RPC
+            if mapping:
+                self._mapping_cache[model] = mapping
+        return mapping
+    
+    def _prefetch_mappings(self, models):
+        """
+        Carga en la caché de _get_cached_mapping, con consultas conjuntas a migration.tracking
+        (get_migration_mappings, con el mismo límite por modelo que get_migration_mapping),
+        los mapeos de los modelos indicados que aún no están en caché.
+        
+        Args:
+            models: Nombres de los modelos
+        """
+        missing = [m for m in models if m not in self._mapping_cache]
+        if not missing:
+            return
+        for prefetch_model, mapping in self.v18_conn.get_migration_mappings(missing).items():
+            # Igual que _get_cached_mapping: no memoizar mapeos vacíos
+            if mapping:
+                self._mapping_cache[prefetch_model] = _int_keys(mapping)
+    
+    def _get_fields_meta(self, model: str) -> FieldsMeta:
+        """
+        Clasifica los campos v18 de un modelo en una sola pasada sobre fields_get.
+        El resultado se memoiza por modelo (el esquema no cambia entre batches).
+        
+        Args:
+            model: Nombre del modelo
+        
+        Returns:
+            FieldsMeta con los conjuntos de campos y el mapa campo -> tipo
+        """
+        meta = self._fields_meta_cache.get(model)
+        if meta is not None:
+            return meta
+        
+        v18_fields = self._get_fields_cached(model)
+        readonly_fields = set()
+        computed_fields = set()
+        no_store_fields = set()  # Campos sin store (computed) que no se pueden establecer en create()
+        required_fields = set()
+        field_type_map = {}
+        
+        for field_name, field_info in v18_fields.items():
+            field_type = field_info.get('type', '')
+            field_type_map[field_name] = field_type
+            if field_info.get('required', False):
+                required_fields.add(field_name)
+            # NUNCA excluir 'name' (es requerido y debe tener valor, aunque sea readonly o computed)
+            if field_name == 'name':
+                continue
+            if field_info.get('readonly', False):
+                readonly_fields.add(field_name)
+            # Los campos one2many/many2many no se incluyen en create()
+            if field_type in ('one2many', 'many2many'):
+                computed_fields.add(field_name)
+            # Excluir campos sin store (computed) - no se pueden establecer en create()
+            # EXCEPCIÓN: 'name' en res.users aunque sea computed (se necesita para crear el usuario)
+            if not field_info.get('store', True):
+                no_store_fields.add(field_name)
+        
+        meta = FieldsMeta(
+            valid_field_names=frozenset(v18_fields),
+            readonly_fields=frozenset(readonly_fields),
+            computed_fields=frozenset(computed_fields),
+            no_store_fields=frozenset(no_store_fields),
+            required_fields=frozenset(required_fields),
+            field_type_map=field_type_map,
+            drop_fields=frozenset(
+                readonly_fields | computed_fields | no_store_fields
+                | {f for f, t in field_type_map.items() if t == 'many2many'}
+            ),
+            create_required_fields=tuple(
+                f for f in v18_fields if f in required_fields and f not in no_store_fields
+            ),
+        )
+        # Igual que en _get_fields_cached: no memoizar si fields_get falló
+        if v18_fields:
+            self._fields_meta_cache[model] = meta
+        return meta
+    
     def has_parent_id(self, model: str, conn: OdooConnection) -> bool:
         """
         Verifica si un modelo tiene el campo parent_id.
@@ -2303,7 +2854,7 @@ class MigrationScript:
             True si tiene parent_id, False en caso contrario
         """
         try:
-            fields_info = conn.get_fields(model)
+            fields_info = self._get_fields_cached(model, conn)
             return 'parent_id' in fields_info
         except Exception as e:
             logger.warning(f"⚠ No se pudo verificar parent_id para {model}: {e}")
@@ -2320,28 +2871,14 @@ class MigrationScript:
         Returns:
             Tupla (records_ordenados, v13_ids_ordenados)
         """
-        records_without_parent = []
-        ids_without_parent = []
-        records_with_parent = []
-        ids_with_parent = []
-        
-        for record, v13_id in zip(records, v13_ids):
-            parent_id = record.get('parent_id', False)
-            
-            # Verificar si tiene parent_id (puede ser False, None, o [id, name])
-            has_parent = False
-            if parent_id:
-                if isinstance(parent_id, (list, tuple)) and len(parent_id) > 0:
-                    has_parent = True
-                elif isinstance(parent_id, (int, str)) and parent_id:
-                    has_parent = True
-            
-            if has_parent:
-                records_with_parent.append(record)
-                ids_with_parent.append(v13_id)
-            else:
-                records_without_parent.append(record)
-                ids_without_parent.append(v13_id)
+        # parent_id puede ser False, None, 0, [] o [id, name]: bool() ya es False
+        # para todos los valores vacíos y True para [id, name] o un ID
+        has_parent_keys = [bool(record.get('parent_id')) for record in records]
+        pairs = list(zip(records, v13_ids, has_parent_keys))
+        records_without_parent = [record for record, _, has_parent in pairs if not has_parent]
+        ids_without_parent = [v13_id for _, v13_id, has_parent in pairs if not has_parent]
+        records_with_parent = [record for record, _, has_parent in pairs if has_parent]
+        ids_with_parent = [v13_id for _, v13_id, has_parent in pairs if has_parent]
         
         # Primero los sin parent, luego los con parent
         sorted_records = records_without_parent + records_with_parent
@@ -2352,74 +2889,143 @@ class MigrationScript:
         return sorted_records, sorted_ids
     
     def prepare_records_for_creation(self, records: List[Dict], model: str, 
-                                   models_list: List[str] = None) -> List[Dict]:
+                                   models_list: List[str] = None) -> Iterator[PreparedRecord]:
         """
         Prepara registros para creación en v18, validando campos y limpiando datos inválidos.
         También mapea campos many2many que vienen como arrays simples de IDs (ej: category_id: [3]).
         
+        Es un generador: cada registro preparado se entrega en cuanto está listo, sin
+        acumular una segunda copia del batch. Usar list(...) si se necesita una lista.
+        
         Args:
             records: Lista de registros a preparar
             model: Nombre del modelo
             models_list: Lista de modelos a migrar (para mapear relaciones many2many)
         
-        Returns:
-            Lista de registros preparados y validados
+        Yields:
+            PreparedRecord(record, m2m_fields, v13_id, uom_name_changes) por cada registro
         """
         if not records:
-            return []
+            return
+        
+        yielded_count = 0  # Registros ya entregados (para el fallback en caso de error)
         
         # Obtener campos válidos del modelo en v18
         try:
-            v18_fields = self.v18_conn.get_fields(model)
-            valid_field_names = set(v18_fields.keys())
+            v18_fields = self._get_fields_cached(model)
             
             # Campos que siempre debemos excluir
             system_fields = {'id', 'create_uid', 'write_uid', 'create_date', 'write_date'}
             
-            # Identificar campos readonly y computed sin store
-            readonly_fields = set()
-            computed_fields = set()
-            no_store_fields = set()  # Campos sin store (computed) que no se pueden establecer en create()
-            
-            for field_name, field_info in v18_fields.items():
-                # NUNCA excluir 'name' aunque sea readonly (es requerido y debe tener valor)
-                if field_info.get('readonly', False) and field_name != 'name':
-                    readonly_fields.add(field_name)
-                # Los campos computed sin store no deben incluirse (excepto name si es requerido)
-                if field_info.get('type') in ['one2many', 'many2many'] and field_name != 'name':
-                    computed_fields.add(field_name)
-                # Excluir campos sin store (computed) - no se pueden establecer en create()
-                # EXCEPCIÓN: 'name' en res.users aunque sea computed (se necesita para crear el usuario)
-                if not field_info.get('store', True) and field_name != 'name':
-                    no_store_fields.add(field_name)
-            
-            prepared_records = []
-            removed_fields_count = {}
+            # Clasificación de campos (readonly, computed, sin store, requeridos), memoizada por modelo
+            fields_meta = self._get_fields_meta(model)
+            valid_field_names = fields_meta.valid_field_names
+            readonly_fields = fields_meta.readonly_fields
+            computed_fields = fields_meta.computed_fields
+            required_fields = fields_meta.required_fields
+            create_required_fields = fields_meta.create_required_fields
+            name_required = 'name' in required_fields
+            field_type_map = fields_meta.field_type_map
+            drop_fields = fields_meta.drop_fields
+            
+            # Casos especiales por modelo: invariantes del bucle, se evalúan una sola vez
+            is_uom = model == 'uom.uom'
+            is_res_partner = model == 'res.partner'
+            is_res_users = model == 'res.users'
+            is_crm_team = model == 'crm.team'
+            is_product = model in _PRODUCT_MODELS
+            is_pricelist_item = model == 'product.pricelist.item'
+            is_sale_subscription = model == 'sale.subscription'
+            model_mappings = self.compiled_field_mappings.get(model) or {}
+            field_renames = _FIELD_RENAMES.get(model, ())
+            
+            # Many2one que se traducen directamente v13 -> v18 con un diccionario (sin valor por defecto):
+            # campo -> (etiqueta de log, mapeo {v13_id: v18_id}, cambios de nombre o None)
+            direct_m2o_maps = {}
+            if self.currency_mapping:
+                direct_m2o_maps['currency_id'] = ('CURRENCY', self.currency_mapping, None)
+            if self._uom_mapping_dict:
+                for uom_field in _UOM_FIELDS:
+                    direct_m2o_maps[uom_field] = ('UOM', self._uom_mapping_dict, self._uom_name_change_map)
+            
+            model_m2o_by_name = self.m2o_fields_by_name.get(model) or {}
+            
+            # Valores por defecto (compañía, uom/categoría ID=1): una sola vez por migración
+            self._prefetch_defaults()
+            
+            # sale.subscription necesita los mapeos de res.partner, res.company y product.pricelist
+            # (este último solo si aún no lo cargó _migrate_batches_with_mapping): los que aún no
+            # están en caché se piden juntos en una sola consulta a migration.tracking
+            if is_sale_subscription:
+                self._prefetch_mappings(('res.partner', 'res.company', 'product.pricelist'))
+                if not self.pricelist_mapping:
+                    self.pricelist_mapping = self._get_cached_mapping('product.pricelist')
+                    logger.info(f"  [PRICELIST MAP] Cargado mapeo de product.pricelist: {len(self.pricelist_mapping)} registros")
+            
+            # Alias locales de los mapeos consultados por campo dentro del bucle (evita self.X en cada acceso)
+            pricelist_mapping = self.pricelist_mapping
+            uom_category_mapping = self.uom_category_mapping
+            
+            # Campos many2one con mapeo específico activo en esta llamada: los mapeos no cambian
+            # durante el bucle, así que el resto de many2one se salta el bloque de mapeos específicos
+            map_pricelist_ids = is_sale_subscription and bool(pricelist_mapping)
+            special_m2o_fields = set(direct_m2o_maps)
+            if map_pricelist_ids:
+                special_m2o_fields.add('pricelist_id')
+            if is_uom:
+                special_m2o_fields.add('category_id')
+            # IDs v13 de categorías UoM ordenados para los logs: una sola ordenación por llamada, no por registro
+            uom_category_sorted_keys = tuple(sorted(uom_category_mapping)) if is_uom else ()
+            
+            # Precargar mapeos v13 -> v18 de los modelos relacionados (many2one/many2many) una sola vez
+            # por llamada, en lugar de una llamada RPC a get_migration_mapping por campo y por registro.
+            # Se leen de _get_cached_mapping (claves int; el mapeo del propio modelo se recarga por batch)
+            relation_mappings: Dict[str, Dict[int, int]] = {}
+            if models_list:
+                record_field_names = set().union(*records) & valid_field_names
+                relation_models = {
+                    v18_fields[field_name].get('relation', '')
+                    for field_name in record_field_names
+                    if field_type_map.get(field_name) in ('many2many', 'many2one')
+                }.intersection(models_list)
+                # Los que no están en caché se piden juntos en una sola consulta
+                self._prefetch_mappings(relation_models)
+                for relation_model in relation_models:
+                    relation_mappings[relation_model] = self._get_cached_mapping(relation_model)
+            
+            removed_fields_count = set()
             
             # Log de diagnóstico para uom.uom
-            if model == 'uom.uom' and records:
+            if is_uom and records:
                 first_record = records[0]
                 if 'category_id' in first_record:
                     logger.info(f"[DIAGNÓSTICO] Primer registro de uom.uom, category_id ANTES de prepare_records_for_creation: {first_record['category_id']} (tipo: {type(first_record['category_id'])})")
             
-            # Identificar campos requeridos en v18
-            required_fields = set()
-            for field_name, field_info in v18_fields.items():
-                if field_info.get('required', False):
-                    required_fields.add(field_name)
-            
             # IDs de stages para sale.subscription (obtenidos directamente de la DB)
             # In progress = 3, Closed = 4
             IN_PROGRESS_STAGE_ID = 3
             CLOSED_STAGE_ID = 4
-            
-            if model == 'sale.subscription' and 'stage_id' in valid_field_names:
+            # Fecha actual para calcular el stage de cada contrato (constante durante el batch)
+            today = date.today()
+            
+            # Etiqueta "OLDv13" para productos: obtenerla o crearla una sola vez, antes del bucle
+            oldv13_tag_id = None
+            if is_product:
+                if self.oldv13_tag_id is None:
+                    self.oldv13_tag_id = self.get_or_create_oldv13_tag()
+                oldv13_tag_id = self.oldv13_tag_id
+                if not oldv13_tag_id:
+                    logger.warning(f"  [ETIQUETA] ⚠ No se pudo obtener/crear etiqueta 'OLDv13' para {model}, los registros de este batch no la tendrán")
+            
+            if is_sale_subscription and 'stage_id' in valid_field_names:
                 logger.info(f"  [ESTADO] IDs de stages para sale.subscription: In progress={IN_PROGRESS_STAGE_ID}, Closed={CLOSED_STAGE_ID}")
             
             for record in records:
                 prepared_record = {}
                 # Almacenar campos many2many para aplicarlos después con write
                 m2m_fields = {}
+                # Cambios de nombre de uom detectados (se registran después en migration.tracking)
+                uom_name_changes = []
                 
                 # IMPORTANTE: Guardar el ID del registro v13 ANTES de procesarlo
                 # porque el campo 'id' se excluirá más adelante
@@ -2427,17 +3033,15 @@ class MigrationScript:
                 
                 # PASO 0: Asegurar que campos requeridos críticos tengan valores ANTES de procesar otros campos
                 # Esto es especialmente importante para 'name' en res.partner
-                if 'name' in required_fields:
+                if name_required:
                     name_value = record.get('name')
                     record_id = record.get('id', 'Unknown')
                     
                     # Verificar si name está vacío o no existe
-                    is_name_empty = (name_value is None or 
-                                   name_value is False or 
-                                   (isinstance(name_value, str) and not name_value.strip()))
+                    is_name_empty = _is_empty(name_value)
                     
                     if is_name_empty:
-                        if model == 'res.partner':
+                        if is_res_partner:
                             # Intentar usar display_name como fallback
                             display_name = record.get('display_name')
                             
@@ -2448,7 +3052,7 @@ class MigrationScript:
                                 prepared_record['name'] = " "
                         else:
                             prepared_record['name'] = f"{model} {record_id}"
-                        logger.debug(f"  [PRE-ASIGNACIÓN] Campo 'name' vacío en {model} (ID: {record_id}), asignado: {prepared_record['name']}")
+                        logger.debug("  [PRE-ASIGNACIÓN] Campo 'name' vacío en %s (ID: %s), asignado: %s", model, record_id, prepared_record['name'])
                     else:
                         # name tiene un valor válido, guardarlo para procesarlo después
                         prepared_record['name'] = name_value
@@ -2458,71 +3062,44 @@ class MigrationScript:
                     if field_name in system_fields:
                         continue
                     
-                    # Excluir campos que no existen en v18
-                    if field_name not in valid_field_names:
-                        removed_fields_count[field_name] = removed_fields_count.get(field_name, 0) + 1
-                        continue
-                    
-                    # Excluir campos readonly (PRIMERO, antes de procesar valores)
-                    if field_name in readonly_fields:
-                        removed_fields_count[field_name] = removed_fields_count.get(field_name, 0) + 1
+                    # Excluir campos que no existen en v18, readonly, computed (one2many/many2many),
+                    # sin store o many2many (PRIMERO, antes de procesar valores): un solo test de conjunto
+                    if field_name not in valid_field_names or field_name in drop_fields:
+                        removed_fields_count.add(field_name)
                         continue
                     
-                    # Excluir campos computed (one2many, many2many) (PRIMERO, antes de procesar valores)
-                    if field_name in computed_fields:
-                        removed_fields_count[field_name] = removed_fields_count.get(field_name, 0) + 1
-                        continue
-                    
-                    # Excluir campos sin store (computed) - no se pueden establecer en create() (CRÍTICO: ANTES de procesar valores)
-                    # Estos campos pueden tener valores pero no se pueden establecer en create()
-                    if field_name in no_store_fields:
-                        removed_fields_count[field_name] = removed_fields_count.get(field_name, 0) + 1
-                        continue
-                    
-                    # Excluir campos many2many explícitamente (no se pueden establecer en create)
-                    field_info_check = v18_fields.get(field_name, {})
-                    if field_info_check.get('type') == 'many2many':
-                        removed_fields_count[field_name] = removed_fields_count.get(field_name, 0) + 1
-                        continue
+                    # Información del campo en v18: se obtiene una sola vez por campo
+                    field_info = v18_fields[field_name]
+                    field_type = field_info.get('type', '')
+                    field_required = field_name in required_fields
                     
                     # Si 'name' ya fue pre-asignado, actualizarlo con el valor del registro si es válido
                     if field_name == 'name' and 'name' in prepared_record:
                         # Si el valor del registro es válido, usarlo; si no, mantener el pre-asignado
-                        is_empty = (field_value is None or 
-                                   field_value is False or 
-                                   (isinstance(field_value, str) and not field_value.strip()))
-                        if not is_empty:
+                        # (is_name_empty ya se calculó en el PASO 0 sobre este mismo valor)
+                        if not is_name_empty:
                             prepared_record['name'] = field_value
                         # Continuar para procesar otros campos, pero name ya está asignado
                         continue
                     
-                    # Convertir valores booleanos de JSON (true/false) a Python (True/False)
-                    # Esto es necesario porque JSON puede tener valores booleanos que no son válidos en Python
-                    if isinstance(field_value, bool):
-                        # Mantener el valor booleano tal cual
-                        pass
-                    elif field_value == "false" or field_value == "False":
-                        field_value = False
-                    elif field_value == "true" or field_value == "True":
-                        field_value = True
+                    # Convertir valores booleanos de JSON como texto ("true"/"false") a Python (True/False)
+                    # Una sola búsqueda en tabla en lugar de cuatro comparaciones por campo
+                    if type(field_value) is str:
+                        field_value = _BOOL_STRINGS.get(field_value, field_value)
                     
                     # Manejar valores None o vacíos: solo incluir si el campo no es required
                     # Verificar si el valor es None, False, o cadena vacía
-                    is_empty = (field_value is None or 
-                               field_value is False or 
-                               (isinstance(field_value, str) and not field_value.strip()))
+                    is_empty = _is_empty(field_value)
                     
                     if is_empty:
-                        field_info = v18_fields.get(field_name, {})
-                        if field_info.get('required', False):
+                        if field_required:
                             # Si es required y está vacío, intentar usar valor por defecto o False
-                            field_type = field_info.get('type', '')
                             
                             # Casos especiales para campos requeridos comunes
                             if field_name == 'name':
                                 # name es requerido en muchos modelos, usar un valor por defecto
                                 record_id = record.get('id', 'Unknown')
-                                if model == 'res.partner':
+                                if is_res_partner:
                                     # Intentar usar display_name como fallback
                                     display_name = record.get('display_name')
                                     
@@ -2533,66 +3110,37 @@ class MigrationScript:
                                         field_value = " "
                                 else:
                                     field_value = f"{model} {record_id}"
-                                logger.debug(f"  Campo 'name' null/vacío en {model}, usando valor por defecto: {field_value}")
+                                logger.debug("  Campo 'name' null/vacío en %s, usando valor por defecto: %s", model, field_value)
                             elif field_type == 'many2one':
                                 # Para campos many2one requeridos, usar False (Odoo creará el valor por defecto si es necesario)
                                 # Caso especial: company_id en res.users debe tener un valor si es requerido
                                 # (aunque res.company no esté en models_to_migrate.txt)
-                                if field_name == 'company_id' and model == 'res.users':
+                                if field_name == 'company_id' and is_res_users:
                                     # Buscar la compañía principal (normalmente la primera o la que tiene id=1)
-                                    try:
-                                        company_domain = []
-                                        companies = self.v18_conn.search_read('res.company', company_domain, ['id'], limit=1)
-                                        if companies:
-                                            field_value = companies[0]['id']
-                                            logger.debug(f"  Campo requerido {field_name} en {model} sin valor (res.company no migrado), usando compañía por defecto: {field_value}")
-                                        else:
-                                            # Si no hay compañías, usar False y dejar que Odoo use su valor por defecto
-                                            field_value = False
-                                            logger.warning(f"  ⚠ No se encontró compañía por defecto para {field_name} en {model}, usando False")
-                                    except Exception as e:
-                                        logger.warning(f"  ⚠ Error buscando compañía por defecto para {field_name} en {model}: {e}, usando False")
-                                        field_value = False
+                                    field_value = self._get_default_company_id()
+                                    if field_value:
+                                        logger.debug("  Campo requerido %s en %s sin valor (res.company no migrado), usando compañía por defecto: %s", field_name, model, field_value)
+                                    else:
+                                        # Si no hay compañías, usar False y dejar que Odoo use su valor por defecto
+                                        logger.warning("  ⚠ No se encontró compañía por defecto para %s en %s, usando False", field_name, model)
                                 # Caso especial: alias_id en crm.team es requerido pero puede ser False
-                                elif field_name == 'alias_id' and model == 'crm.team':
+                                elif field_name == 'alias_id' and is_crm_team:
                                     field_value = False
-                                    logger.debug(f"  Campo requerido {field_name} en {model} sin valor, usando False (Odoo creará el alias automáticamente)")
+                                    logger.debug("  Campo requerido %s en %s sin valor, usando False (Odoo creará el alias automáticamente)", field_name, model)
                                 else:
                                     field_value = False
-                            elif field_type in ['integer', 'float']:
+                            elif field_type in ('integer', 'float'):
                                 field_value = 0
                             elif field_type == 'boolean':
                                 field_value = False
                             elif field_type == 'selection':
                                 # Para campos selection requeridos, usar valores por defecto según el modelo
-                                if model in ['product.template', 'product.product']:
-                                    if field_name == 'service_tracking':
-                                        field_value = 'no'
-                                    elif field_name == 'purchase_line_warn':
-                                        field_value = 'no-message'
-                                    elif field_name == 'sale_line_warn':
-                                        field_value = 'no-message'
-                                    else:
-                                        field_value = False
-                                elif model == 'product.pricelist.item':
-                                    if field_name == 'display_applied_on':
-                                        # Mapear desde applied_on
-                                        applied_on = record.get('applied_on', '')
-                                        if applied_on == '1_product':
-                                            field_value = '1_product'
-                                        elif applied_on == '2_product_category':
-                                            field_value = '2_product_category'
-                                        elif applied_on == '0_product_variant':
-                                            field_value = '1_product'  # Product variant -> Product
-                                        elif applied_on == '3_global':
-                                            field_value = '1_product'  # Global -> Product (por defecto)
-                                        else:
-                                            field_value = '1_product'  # Valor por defecto
-                                    else:
-                                        field_value = False
+                                if is_pricelist_item and field_name == 'display_applied_on':
+                                    # Mapear desde applied_on
+                                    field_value = _DISPLAY_APPLIED_ON_MAP.get(record.get('applied_on', ''), '1_product')
                                 else:
-                                    field_value = False
-                            elif field_type in ['char', 'text']:
+                                    field_value = _SELECTION_DEFAULTS.get((model, field_name), False)
+                            elif field_type in ('char', 'text'):
                                 # Para campos de texto requeridos, usar valor por defecto
                                 if field_name == 'name':
                                     record_id = record.get('id', 'Unknown')
@@ -2601,7 +3149,7 @@ class MigrationScript:
                                     field_value = ""
                             else:
                                 # Para otros tipos, intentar usar valor por defecto según el tipo
-                                if field_type in ['date', 'datetime']:
+                                if field_type in ('date', 'datetime'):
                                     continue  # Omitir fechas null requeridas
                                 else:
                                     field_value = ""
@@ -2612,81 +3160,76 @@ class MigrationScript:
                     # Manejar campos many2many que vienen como arrays simples (ej: category_id: [3])
                     # Estos campos necesitan mapeo de IDs de v13 a v18
                     # EXCEPCIÓN: category_id para uom.uom se procesa más adelante con mapeo especial
-                    if isinstance(field_value, list) and len(field_value) > 0:
+                    if isinstance(field_value, list) and field_value:
                         # Excluir category_id para uom.uom (se procesa con mapeo especial más adelante)
-                        if field_name == 'category_id' and model == 'uom.uom':
+                        if field_name == 'category_id' and is_uom:
                             # No procesar aquí, continuar para que se procese con el mapeo especial
                             pass
                         else:
-                            # Verificar si es un array simple de IDs (no tuplas)
-                            if all(isinstance(item, (int, str)) and not isinstance(item, (list, tuple)) for item in field_value):
+                            # Verificar si es un array simple de IDs (no tuplas): las listas de IDs de Odoo son
+                            # homogéneas, basta con mirar el primer elemento
+                            if isinstance(field_value[0], (int, str)):
                                 # Es un array simple de IDs, verificar si necesita mapeo
-                                field_info_check = v18_fields.get(field_name, {})
-                                field_type_check = field_info_check.get('type', '')
-                                
                                 # Si es many2many o many2one, mapear cada ID
-                                if field_type_check in ['many2many', 'many2one']:
+                                if field_type in ('many2many', 'many2one'):
                                     # Obtener el modelo relacionado
-                                    relation_model = field_info_check.get('relation', '')
-                                if relation_model and models_list and relation_model in models_list:
-                                    # Obtener mapeo para el modelo relacionado
-                                    relation_mapping = self.v18_conn.get_migration_mapping(relation_model)
-                                    if relation_mapping:
-                                        # Mapear cada ID del array
-                                        mapped_ids = []
-                                        for v13_id in field_value:
-                                            v13_id_str = str(v13_id)
-                                            if v13_id_str in relation_mapping:
-                                                v18_id = relation_mapping[v13_id_str]
-                                                mapped_ids.append(v18_id)
-                                            else:
-                                                logger.debug(f"  No se encontró mapeo para {field_name}={v13_id} en {relation_model}, omitiendo")
-                                        # Para many2many, guardar los IDs mapeados para aplicarlos después con write
-                                        # NO incluirlos en el registro preparado (se aplicarán después)
-                                        if field_type_check == 'many2many':
-                                            if mapped_ids:
-                                                # Guardar para aplicar después con write usando comando [(6, 0, [ids])]
-                                                m2m_fields[field_name] = mapped_ids
-                                                logger.info(f"  [M2M] ✓ Guardados {len(mapped_ids)} IDs mapeados para {field_name} de {model} -> {relation_model} (v13: {field_value} -> v18: {mapped_ids})")
-                                                # NO incluir este campo en prepared_record (se aplicará después)
-                                                continue
-                                            else:
-                                                logger.warning(f"  [M2M] ⚠ No se encontraron mapeos para {field_name} en {model} (IDs v13: {field_value}), se omitirá")
-                                                # NO incluir este campo en prepared_record
-                                                continue
-                                        else:
-                                            # Para many2one, actualizar el valor normalmente
-                                            if mapped_ids:
-                                                field_value = mapped_ids[0] if mapped_ids else False
-                                                logger.debug(f"  Mapeados {len(mapped_ids)} IDs en {field_name} de {model} (many2one)")
+                                    relation_model = field_info.get('relation', '')
+                                    if relation_model and models_list and relation_model in models_list:
+                                        # Obtener mapeo para el modelo relacionado
+                                        relation_mapping = relation_mappings.get(relation_model)
+                                        if relation_mapping:
+                                            # Mapear cada ID del array
+                                            mapped_ids = []
+                                            for v13_id in field_value:
+                                                if isinstance(v13_id, str) and v13_id.isdigit():
+                                                    v13_id = int(v13_id)  # IDs exportados como texto
+                                                v18_id = relation_mapping.get(v13_id)
+                                                if v18_id is not None:
+                                                    mapped_ids.append(v18_id)
+                                                else:
+                                                    logger.debug("  No se encontró mapeo para %s=%s en %s, omitiendo", field_name, v13_id, relation_model)
+                                            # Para many2many, guardar los IDs mapeados para aplicarlos después con write
+                                            # NO incluirlos en el registro preparado (se aplicarán después)
+                                            if field_type == 'many2many':
+                                                if mapped_ids:
+                                                    # Guardar para aplicar después con write usando comando [(6, 0, [ids])]
+                                                    m2m_fields[field_name] = mapped_ids
+                                                    logger.info("  [M2M] ✓ Guardados %s IDs mapeados para %s de %s -> %s (v13: %s -> v18: %s)", len(mapped_ids), field_name, model, relation_model, field_value, mapped_ids)
+                                                    # NO incluir este campo en prepared_record (se aplicará después)
+                                                    continue
+                                                else:
+                                                    logger.warning("  [M2M] ⚠ No se encontraron mapeos para %s en %s (IDs v13: %s), se omitirá", field_name, model, field_value)
+                                                    # NO incluir este campo en prepared_record
+                                                    continue
                                             else:
-                                                field_value = False
-                                                logger.debug(f"  No se encontraron mapeos para {field_name} en {model}, usando False")
+                                                # Para many2one, actualizar el valor normalmente
+                                                if mapped_ids:
+                                                    field_value = mapped_ids[0] if mapped_ids else False
+                                                    logger.debug("  Mapeados %s IDs en %s de %s (many2one)", len(mapped_ids), field_name, model)
+                                                else:
+                                                    field_value = False
+                                                    logger.debug("  No se encontraron mapeos para %s en %s, usando False", field_name, model)
                     
-                    # Aplicar mapeos de campos si existen
-                    if model in self.field_mappings:
-                        model_mappings = self.field_mappings[model]
-                        if field_name in model_mappings:
-                            mapping = model_mappings[field_name]
-                            # El mapeo es un diccionario con valores a mapear
-                            if isinstance(mapping, dict):
-                                # Buscar el valor en el mapeo (ignorar 'description' y 'default' si existen)
-                                field_value_str = str(field_value) if field_value is not None else 'None'
-                                if field_value_str in mapping and field_value_str not in ['description', 'default']:
-                                    new_value = mapping[field_value_str]
-                                    logger.debug(f"  Mapeando {model}.{field_name}: '{field_value}' -> '{new_value}'")
-                                    field_value = new_value
-                                elif 'default' in mapping and field_value_str not in mapping:
-                                    # Si hay un valor por defecto y el valor actual no está en el mapeo
-                                    logger.debug(f"  Usando valor por defecto para {model}.{field_name}: '{mapping['default']}'")
-                                    field_value = mapping['default']
+                    # Aplicar mapeos de campos si existen (precompilados en compile_field_mappings)
+                    if field_name in model_mappings:
+                        value_map, has_default, default_value = model_mappings[field_name]
+                        value_key = None
+                        if field_value is not None:
+                            value_key = field_value if type(field_value) is str else str(field_value)
+                        if value_key is not None and value_key in value_map:
+                            new_value = value_map[value_key]
+                            logger.debug("  Mapeando %s.%s: '%s' -> '%s'", model, field_name, field_value, new_value)
+                            field_value = new_value
+                        elif has_default:
+                            # Si hay un valor por defecto y el valor actual no está en el mapeo
+                            logger.debug("  Usando valor por defecto para %s.%s: '%s'", model, field_name, default_value)
+                            field_value = default_value
                     
                     # Convertir campos many2one que vienen como tuplas [id, name] a solo el ID
                     # EXCEPCIÓN: category_id para uom.uom se procesa más adelante con mapeo especial
-                    field_info = v18_fields.get(field_name, {})
-                    if field_info.get('type') == 'many2one':
+                    if field_type == 'many2one':
                         # Excluir category_id para uom.uom (se procesa con mapeo especial más adelante)
-                        if field_name == 'category_id' and model == 'uom.uom':
+                        if field_name == 'category_id' and is_uom:
                             # No procesar aquí, continuar para que se procese con el mapeo especial
                             pass
                         else:
@@ -2694,11 +3237,11 @@ class MigrationScript:
                             if isinstance(field_value, list) and len(field_value) >= 1:
                                 # Es una tupla many2one, extraer el ID
                                 field_value = field_value[0] if field_value[0] else False
-                                logger.debug(f"  Campo many2one {field_name} convertido de tupla a ID: {field_value}")
+                                logger.debug("  Campo many2one %s convertido de tupla a ID: %s", field_name, field_value)
                         
                         # Verificar si este campo debe buscarse/crearse por nombre
-                        if model in self.m2o_fields_by_name and field_name in self.m2o_fields_by_name[model]:
-                            m2o_config = self.m2o_fields_by_name[model][field_name]
+                        if field_name in model_m2o_by_name:
+                            m2o_config = model_m2o_by_name[field_name]
                             relation_model = m2o_config.get('model')
                             search_field = m2o_config.get('search_field', 'name')
                             create_if_not_exists = m2o_config.get('create_if_not_exists', False)
@@ -2707,9 +3250,11 @@ class MigrationScript:
                             # El field_value puede venir como ID o como tupla [id, name]
                             related_name = None
                             
-                            if isinstance(field_value, list) and len(field_value) >= 2:
+                            if isinstance(field_value, list):
                                 # Formato tupla: [id, name]
-                                related_name = field_value[1] if isinstance(field_value[1], str) else None
+                                related_name = _unpack_m2o(field_value)[1]
+                                if not isinstance(related_name, str):
+                                    related_name = None
                             elif isinstance(field_value, (int, str)) and field_value:
                                 # Es un ID, intentar obtener el nombre desde el registro original
                                 # Buscar en el registro si hay información del campo relacionado
@@ -2718,7 +3263,7 @@ class MigrationScript:
                                     related_name = record[related_record_key]
                                 else:
                                     # Intentar obtener desde el campo display_name del relacionado
-                                    logger.debug(f"  Campo {field_name} tiene ID {field_value}, pero no se encontró nombre en el registro")
+                                    logger.debug("  Campo %s tiene ID %s, pero no se encontró nombre en el registro", field_name, field_value)
                             
                             # Para res.country.state, necesitamos obtener country_id desde el registro
                             # Intentar obtener country_id desde el registro de res.partner
@@ -2726,17 +3271,10 @@ class MigrationScript:
                             if relation_model == 'res.country.state':
                                 # Buscar country_id en el registro
                                 if 'country_id' in record:
-                                    country_id_v13 = record['country_id']
-                                    # country_id puede venir como [id, name] o como ID
-                                    if isinstance(country_id_v13, list) and len(country_id_v13) >= 1:
-                                        country_id_v13_value = country_id_v13[0]
-                                        country_id_v13_name = country_id_v13[1] if len(country_id_v13) >= 2 else None
-                                    elif isinstance(country_id_v13, (int, str)):
-                                        country_id_v13_value = country_id_v13
+                                    # country_id puede venir como [id, name] o como ID (el nombre en country_id_name)
+                                    country_id_v13_value, country_id_v13_name = _unpack_m2o(record['country_id'])
+                                    if country_id_v13_name is None and country_id_v13_value is not None:
                                         country_id_v13_name = record.get('country_id_name')
-                                    else:
-                                        country_id_v13_value = None
-                                        country_id_v13_name = None
                                     
                                     if country_id_v13_value:
                                         # Intentar buscar país por nombre primero
@@ -2748,14 +3286,12 @@ class MigrationScript:
                                         
                                         # Si no se encontró por nombre, intentar por ID usando migration.tracking
                                         if not country_id_v18:
-                                            country_mapping = self.v18_conn.get_migration_mapping('res.country')
+                                            country_mapping = self._get_cached_mapping('res.country')
                                             if country_mapping:
-                                                country_id_str = str(country_id_v13_value)
-                                                if country_id_str in country_mapping:
-                                                    country_id_v18 = country_mapping[country_id_str]
+                                                country_id_v18 = country_mapping.get(_extract_v13_id(country_id_v13_value))
                                         
                                         if not country_id_v18:
-                                            logger.warning(f"  No se pudo obtener country_id para estado '{related_name}', se intentará usar país por defecto")
+                                            logger.warning("  No se pudo obtener country_id para estado '%s', se intentará usar país por defecto", related_name)
                             
                             if related_name:
                                 # Buscar por nombre en v18
@@ -2773,40 +3309,34 @@ class MigrationScript:
                                 )
                                 if v18_id:
                                     field_value = v18_id
-                                    logger.debug(f"  Campo {field_name} mapeado por nombre '{related_name}' -> ID v18: {v18_id}")
+                                    logger.debug("  Campo %s mapeado por nombre '%s' -> ID v18: %s", field_name, related_name, v18_id)
                                 else:
                                     field_value = False
-                                    logger.warning(f"  No se pudo encontrar/crear registro en {relation_model} con {search_field}='{related_name}'")
+                                    logger.warning("  No se pudo encontrar/crear registro en %s con %s='%s'", relation_model, search_field, related_name)
                             else:
                                 # Si no hay nombre, usar False
                                 field_value = False
-                                logger.debug(f"  Campo {field_name} no tiene nombre, usando False")
+                                logger.debug("  Campo %s no tiene nombre, usando False", field_name)
                     
                     # Verificar nuevamente si el valor es vacío después del mapeo (especialmente para campos requeridos)
-                    field_info = v18_fields.get(field_name, {})
-                    if field_info.get('required', False):
-                        is_empty_after_mapping = (field_value is None or 
-                                                 field_value is False or 
-                                                 (isinstance(field_value, str) and not field_value.strip()))
+                    if field_required:
+                        is_empty_after_mapping = _is_empty(field_value, field_type)
                         
                         # Caso especial: company_id requerido en res.users
-                        if is_empty_after_mapping and field_name == 'company_id' and model == 'res.users':
+                        # (res.company no está en models_to_migrate.txt, pero company_id es requerido en v18)
+                        if is_empty_after_mapping and field_name == 'company_id' and is_res_users:
                             # Buscar la compañía principal
-                            try:
-                                company_domain = []
-                                companies = self.v18_conn.search_read('res.company', company_domain, ['id'], limit=1)
-                                if companies:
-                                    field_value = companies[0]['id']
-                                    logger.debug(f"  Campo requerido {field_name} en {model} sin valor después del mapeo, usando compañía por defecto: {field_value}")
-                                else:
-                                    logger.warning(f"  ⚠ No se encontró compañía por defecto para {field_name} en {model} después del mapeo")
-                            except Exception as e:
-                                logger.warning(f"  ⚠ Error buscando compañía por defecto para {field_name} en {model} después del mapeo: {e}")
+                            default_company_id = self._get_default_company_id()
+                            if default_company_id:
+                                field_value = default_company_id
+                                logger.debug("  Campo requerido %s en %s sin valor después del mapeo, usando compañía por defecto: %s", field_name, model, field_value)
+                            else:
+                                logger.warning("  ⚠ No se encontró compañía por defecto para %s en %s después del mapeo", field_name, model)
                         
                         if is_empty_after_mapping and field_name == 'name':
                             # Si name sigue vacío después del mapeo, asignar valor por defecto
                             record_id = record.get('id', 'Unknown')
-                            if model == 'res.partner':
+                            if is_res_partner:
                                 display_name = record.get('display_name')
                                 
                                 if display_name and isinstance(display_name, str) and display_name.strip():
@@ -2816,194 +3346,93 @@ class MigrationScript:
                                     field_value = " "
                             else:
                                 field_value = f"{model} {record_id}"
-                            logger.debug(f"  Campo 'name' quedó vacío después del mapeo en {model}, usando valor por defecto: {field_value}")
-                        
-                        # Caso especial: company_id requerido en res.users
-                        if is_empty_after_mapping and field_name == 'company_id' and model == 'res.users':
-                            # Buscar la compañía principal
-                            try:
-                                company_domain = []
-                                companies = self.v18_conn.search_read('res.company', company_domain, ['id'], limit=1)
-                                if companies:
-                                    field_value = companies[0]['id']
-                                    logger.debug(f"  [POST-MAPEO] Campo requerido {field_name} en {model} sin valor después del mapeo, usando compañía por defecto: {field_value}")
-                                else:
-                                    logger.warning(f"  ⚠ [POST-MAPEO] No se encontró compañía por defecto para {field_name} en {model} después del mapeo")
-                            except Exception as e:
-                                logger.warning(f"  ⚠ [POST-MAPEO] Error buscando compañía por defecto para {field_name} en {model} después del mapeo: {e}")
-                    
-                    # Verificación final para company_id en res.users antes de incluir
-                    # (res.company no está en models_to_migrate.txt, pero company_id es requerido en v18)
-                    if field_name == 'company_id' and model == 'res.users':
-                        # Asegurar que company_id no sea False o None si es requerido
-                        if (field_value is None or field_value is False) and field_info.get('required', False):
-                            try:
-                                company_domain = []
-                                companies = self.v18_conn.search_read('res.company', company_domain, ['id'], limit=1)
-                                if companies:
-                                    field_value = companies[0]['id']
-                                    logger.debug(f"  [FINAL] Campo {field_name} en {model} era False/None (res.company no migrado), asignada compañía por defecto: {field_value}")
-                                else:
-                                    logger.warning(f"  ⚠ [FINAL] No se encontró compañía por defecto para {field_name} en {model}")
-                            except Exception as e:
-                                logger.warning(f"  ⚠ [FINAL] Error buscando compañía por defecto para {field_name} en {model}: {e}")
+                            logger.debug("  Campo 'name' quedó vacío después del mapeo en %s, usando valor por defecto: %s", model, field_value)
                     
                     # Aplicar mapeos específicos para currency, uom y pricelist ANTES de procesar many2one
-                    field_info_check = v18_fields.get(field_name, {})
-                    if field_info_check.get('type') == 'many2one':
-                        # Mapear currency_id
-                        if field_name == 'currency_id' and self.currency_mapping:
-                            if isinstance(field_value, (int, str)):
-                                v13_id_str = str(field_value)
-                                if v13_id_str in self.currency_mapping:
-                                    field_value = self.currency_mapping[v13_id_str]
-                                    logger.debug(f"  [CURRENCY MAP] {field_name} mapeado: v13[{v13_id_str}] -> v18[{field_value}]")
-                            elif isinstance(field_value, list) and len(field_value) >= 1:
-                                v13_id = field_value[0]
-                                if v13_id:
-                                    v13_id_str = str(v13_id)
-                                    if v13_id_str in self.currency_mapping:
-                                        field_value = self.currency_mapping[v13_id_str]
-                                        logger.debug(f"  [CURRENCY MAP] {field_name} mapeado desde tupla: v13[{v13_id_str}] -> v18[{field_value}]")
-                        
-                        # Mapear pricelist_id para sale.subscription
-                        elif field_name == 'pricelist_id' and model == 'sale.subscription':
-                            # Cargar pricelist_mapping si no está cargado
-                            if not self.pricelist_mapping:
-                                self.pricelist_mapping = self.v18_conn.get_migration_mapping('product.pricelist')
-                                logger.debug(f"  [PRICELIST MAP] Cargado mapeo de product.pricelist: {len(self.pricelist_mapping)} registros")
-                            
-                            if self.pricelist_mapping:
-                                v13_pricelist_id = None
-                                if isinstance(field_value, (int, str)):
-                                    v13_pricelist_id = field_value
-                                elif isinstance(field_value, list) and len(field_value) >= 1:
-                                    v13_pricelist_id = field_value[0]
+                    if field_type == 'many2one' and field_name in special_m2o_fields:
+                        # Mapear currency_id, uom_id y uom_po_id (traducción directa con diccionario)
+                        direct_map = direct_m2o_maps.get(field_name)
+                        if direct_map is not None:
+                            map_tag, id_map, name_changes = direct_map
+                            v13_id = _extract_v13_id(field_value)
+                            if v13_id in id_map:
+                                field_value = id_map[v13_id]
+                                logger.debug("  [%s MAP] %s mapeado: v13[%s] -> v18[%s]", map_tag, field_name, v13_id, field_value)
                                 
-                                if v13_pricelist_id:
-                                    v13_id_str = str(v13_pricelist_id)
-                                    if v13_id_str in self.pricelist_mapping:
-                                        mapped_value = self.pricelist_mapping[v13_id_str]
-                                        logger.info(f"  [PRICELIST MAP] ✓ {field_name} mapeado para contrato v13[{record_v13_id}]: v13[{v13_id_str}] -> v18[{mapped_value}]")
-                                        # IMPORTANTE: Guardar el valor mapeado directamente en prepared_record y continuar
-                                        # para evitar que el procesamiento genérico many2one lo sobrescriba
-                                        prepared_record[field_name] = mapped_value
-                                        continue  # Saltar el procesamiento genérico many2one
-                                    else:
-                                        available_ids = sorted(list(self.pricelist_mapping.keys()))[:20]
-                                        logger.error(f"  ✗ [PRICELIST MAP] ERROR: {field_name} v13[{v13_id_str}] del contrato v13[{record_v13_id}] NO encontrado en mapeo de product.pricelist ({len(self.pricelist_mapping)} mapeos disponibles). Ejemplos: {available_ids}")
-                                        # Si no hay mapeo, NO asignar un valor por defecto
-                                        # Dejar que la verificación final lo maneje con un error crítico
-                                        # No continuar, dejar que el procesamiento genérico many2one lo maneje
+                                # Registrar cambio de nombre si existe
+                                if name_changes and v13_id in name_changes:
+                                    change_info = name_changes[v13_id]
+                                    logger.info("  [UOM NAME CHANGE] %s: \"%s\" -> \"%s\" (v13_id: %s, v18_id: %s)", field_name, change_info['v13_name'], change_info['v18_name'], v13_id, field_value)
+                                    # Guardar información para registrar en migration.tracking después
+                                    uom_name_changes.append({
+                                        'field': field_name,
+                                        'v13_id': v13_id,
+                                        'v18_id': field_value,
+                                        'v13_name': change_info['v13_name'],
+                                        'v18_name': change_info['v18_name']
+                                    })
                         
-                        # Mapear uom_id y uom_po_id
-                        elif field_name in ['uom_id', 'uom_po_id'] and self.uom_mapping:
-                            uom_mapping_dict = self.uom_mapping.get('mapping', {})
-                            if isinstance(field_value, (int, str)):
-                                v13_id_str = str(field_value)
-                                if v13_id_str in uom_mapping_dict:
-                                    field_value = uom_mapping_dict[v13_id_str]
-                                    logger.debug(f"  [UOM MAP] {field_name} mapeado: v13[{v13_id_str}] -> v18[{field_value}]")
-                                    
-                                    # Registrar cambio de nombre si existe
-                                    name_changes = self.uom_mapping.get('name_changes', {})
-                                    if v13_id_str in name_changes:
-                                        change_info = name_changes[v13_id_str]
-                                        logger.info(f"  [UOM NAME CHANGE] {field_name}: \"{change_info['v13_name']}\" -> \"{change_info['v18_name']}\" (v13_id: {v13_id_str}, v18_id: {field_value})")
-                                        # Guardar información para registrar en migration.tracking después
-                                        if '_uom_name_changes' not in prepared_record:
-                                            prepared_record['_uom_name_changes'] = []
-                                        prepared_record['_uom_name_changes'].append({
-                                            'field': field_name,
-                                            'v13_id': int(v13_id_str),
-                                            'v18_id': field_value,
-                                            'v13_name': change_info['v13_name'],
-                                            'v18_name': change_info['v18_name']
-                                        })
-                            elif isinstance(field_value, list) and len(field_value) >= 1:
-                                v13_id = field_value[0]
-                                if v13_id:
-                                    v13_id_str = str(v13_id)
-                                    if v13_id_str in uom_mapping_dict:
-                                        field_value = uom_mapping_dict[v13_id_str]
-                                        logger.debug(f"  [UOM MAP] {field_name} mapeado desde tupla: v13[{v13_id_str}] -> v18[{field_value}]")
-                                        
-                                        # Registrar cambio de nombre si existe
-                                        name_changes = self.uom_mapping.get('name_changes', {})
-                                        if v13_id_str in name_changes:
-                                            change_info = name_changes[v13_id_str]
-                                            logger.info(f"  [UOM NAME CHANGE] {field_name}: \"{change_info['v13_name']}\" -> \"{change_info['v18_name']}\" (v13_id: {v13_id_str}, v18_id: {field_value})")
-                                            # Guardar información para registrar en migration.tracking después
-                                            if '_uom_name_changes' not in prepared_record:
-                                                prepared_record['_uom_name_changes'] = []
-                                        prepared_record['_uom_name_changes'].append({
-                                            'field': field_name,
-                                            'v13_id': int(v13_id_str),
-                                            'v18_id': field_value,
-                                            'v13_name': change_info['v13_name'],
-                                            'v18_name': change_info['v18_name']
-                                        })
+                        # Mapear pricelist_id para sale.subscription
+                        # (pricelist_mapping se carga antes del bucle de registros)
+                        elif field_name == 'pricelist_id' and map_pricelist_ids:
+                            v13_id = _extract_v13_id(field_value)
+                            if v13_id:
+                                mapped_value = pricelist_mapping.get(v13_id)
+                                if mapped_value is not None:
+                                    logger.info("  [PRICELIST MAP] ✓ %s mapeado para contrato v13[%s]: v13[%s] -> v18[%s]", field_name, record_v13_id, v13_id, mapped_value)
+                                    # IMPORTANTE: Guardar el valor mapeado directamente en prepared_record y continuar
+                                    # para evitar que el procesamiento genérico many2one lo sobrescriba
+                                    prepared_record[field_name] = mapped_value
+                                    continue  # Saltar el procesamiento genérico many2one
+                                else:
+                                    available_ids = heapq.nsmallest(20, pricelist_mapping)
+                                    logger.error("  ✗ [PRICELIST MAP] ERROR: %s v13[%s] del contrato v13[%s] NO encontrado en mapeo de product.pricelist (%s mapeos disponibles). Ejemplos: %s", field_name, v13_id, record_v13_id, len(pricelist_mapping), available_ids)
+                                    # Si no hay mapeo, NO asignar un valor por defecto
+                                    # Dejar que la verificación final lo maneje con un error crítico
+                                    # No continuar, dejar que el procesamiento genérico many2one lo maneje
                         
                         # Mapear category_id para uom.uom
-                        elif field_name == 'category_id' and model == 'uom.uom':
+                        elif field_name == 'category_id' and is_uom:
                             # El mapeo ya debería estar actualizado al inicio de _migrate_batches_with_mapping
                             # Solo usamos el mapeo actualizado aquí
                             
-                            logger.debug(f"  [UOM CATEGORY MAP] Procesando category_id para {model}. Valor recibido: {field_value} (tipo: {type(field_value)})")
+                            logger.debug("  [UOM CATEGORY MAP] Procesando category_id para %s. Valor recibido: %s (tipo: %s)", model, field_value, type(field_value))
                             
-                            if self.uom_category_mapping:
-                                logger.debug(f"  [UOM CATEGORY MAP] Mapeo disponible con {len(self.uom_category_mapping)} categorías: {sorted(self.uom_category_mapping.keys())}")
+                            if uom_category_mapping:
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug("  [UOM CATEGORY MAP] Mapeo disponible con %d categorías: %s", len(uom_category_mapping), uom_category_sorted_keys)
                                 
-                                if isinstance(field_value, (int, str)):
-                                    v13_id_str = str(field_value)
-                                    logger.debug(f"  [UOM CATEGORY MAP] category_id es int/str: {v13_id_str}")
-                                    if v13_id_str in self.uom_category_mapping:
-                                        field_value = self.uom_category_mapping[v13_id_str]
-                                        logger.debug(f"  [UOM CATEGORY MAP] {field_name} mapeado: v13[{v13_id_str}] -> v18[{field_value}]")
+                                v13_id = _extract_v13_id(field_value)
+                                if v13_id:
+                                    logger.debug("  [UOM CATEGORY MAP] Buscando mapeo para v13_id: %s", v13_id)
+                                    if v13_id in uom_category_mapping:
+                                        field_value = uom_category_mapping[v13_id]
+                                        logger.debug("  [UOM CATEGORY MAP] %s mapeado: v13[%s] -> v18[%s]", field_name, v13_id, field_value)
                                     else:
                                         # Si no hay mapeo, usar categoría por defecto (Unit, ID=1)
-                                        logger.error(f"  [UOM CATEGORY MAP] ❌ ERROR: No se encontró mapeo para category_id v13[{v13_id_str}]. Mapeo actual tiene {len(self.uom_category_mapping)} categorías: {sorted(self.uom_category_mapping.keys())}")
-                                        field_value = 1
-                                        logger.warning(f"  [UOM CATEGORY MAP] ⚠ Usando categoría por defecto: 1 (Unit)")
-                                elif isinstance(field_value, list) and len(field_value) >= 1:
-                                    v13_id = field_value[0]
-                                    logger.debug(f"  [UOM CATEGORY MAP] category_id es lista. Extraído v13_id: {v13_id} (tipo: {type(v13_id)})")
-                                    if v13_id:
-                                        v13_id_str = str(v13_id)
-                                        logger.debug(f"  [UOM CATEGORY MAP] Buscando mapeo para v13_id: {v13_id_str}")
-                                        if v13_id_str in self.uom_category_mapping:
-                                            field_value = self.uom_category_mapping[v13_id_str]
-                                            logger.info(f"  [UOM CATEGORY MAP] ✓ {field_name} mapeado desde tupla: v13[{v13_id_str}] -> v18[{field_value}]")
-                                        else:
-                                            # Si no hay mapeo, usar categoría por defecto (Unit, ID=1)
-                                            logger.error(f"  [UOM CATEGORY MAP] ❌ ERROR: No se encontró mapeo para category_id v13[{v13_id_str}]. Mapeo actual tiene {len(self.uom_category_mapping)} categorías: {sorted(self.uom_category_mapping.keys())}")
-                                            field_value = 1
-                                            logger.warning(f"  [UOM CATEGORY MAP] ⚠ Usando categoría por defecto: 1 (Unit)")
-                                    else:
-                                        # Si el valor es False/None, usar categoría por defecto
+                                        logger.error("  [UOM CATEGORY MAP] ❌ ERROR: No se encontró mapeo para category_id v13[%s]. Mapeo actual tiene %s categorías: %s", v13_id, len(uom_category_mapping), uom_category_sorted_keys)
                                         field_value = 1
-                                        logger.warning(f"  [UOM CATEGORY MAP] ⚠ category_id es False/None, usando categoría por defecto: 1 (Unit)")
-                                elif field_value is False or field_value is None:
+                                        logger.warning("  [UOM CATEGORY MAP] ⚠ Usando categoría por defecto: 1 (Unit)")
+                                else:
                                     # Si el valor es False/None, usar categoría por defecto
                                     field_value = 1
-                                    logger.warning(f"  [UOM CATEGORY MAP] ⚠ category_id es False/None, usando categoría por defecto: 1 (Unit)")
+                                    logger.warning("  [UOM CATEGORY MAP] ⚠ category_id es False/None, usando categoría por defecto: 1 (Unit)")
                             else:
                                 # Si no hay mapeo disponible, usar categoría por defecto
                                 field_value = 1
-                                logger.warning(f"  [UOM CATEGORY MAP] ⚠ No hay mapeo de categorías disponible, usando categoría por defecto: 1 (Unit)")
+                                logger.warning("  [UOM CATEGORY MAP] ⚠ No hay mapeo de categorías disponible, usando categoría por defecto: 1 (Unit)")
                     
                     # IMPORTANTE: Si el campo ya fue procesado y guardado en prepared_record (ej: pricelist_id mapeado),
                     # NO procesarlo de nuevo, preservar el valor ya guardado
                     if field_name in prepared_record:
                         # Log de depuración para pricelist_id
-                        if field_name == 'pricelist_id' and model == 'sale.subscription':
-                            logger.debug(f"  [SKIP] Campo {field_name} ya está en prepared_record con valor: {prepared_record[field_name]} (tipo: {type(prepared_record[field_name])})")
+                        if field_name == 'pricelist_id' and is_sale_subscription:
+                            logger.debug("  [SKIP] Campo %s ya está en prepared_record con valor: %s (tipo: %s)", field_name, prepared_record[field_name], type(prepared_record[field_name]))
                         continue  # El campo ya fue procesado, continuar con el siguiente
                     
                     # IMPORTANTE: Si el campo es many2one y ya tiene un valor entero (ya fue mapeado),
                     # NO procesarlo de nuevo, preservar el valor mapeado
-                    field_info_check = v18_fields.get(field_name, {})
-                    if field_info_check.get('type') == 'many2one':
+                    if field_type == 'many2one':
                         # Si el valor ya es un entero (fue mapeado), preservarlo
                         if isinstance(field_value, int):
                             prepared_record[field_name] = field_value
@@ -3017,13 +3446,13 @@ class MigrationScript:
                         elif isinstance(field_value, (list, tuple)) and len(field_value) > 0:
                             # CRÍTICO: Si user_id en res.partner viene como lista pero no está mapeado,
                             # establecer False para evitar errores de foreign key
-                            if field_name == 'user_id' and model == 'res.partner':
-                                logger.warning(f"  ⚠ CRÍTICO: Campo user_id en res.partner viene como lista [{field_value[0]}, ...] pero no está mapeado, estableciendo False para evitar error de foreign key")
+                            if field_name == 'user_id' and is_res_partner:
+                                logger.warning("  ⚠ CRÍTICO: Campo user_id en res.partner viene como lista [%s, ...] pero no está mapeado, estableciendo False para evitar error de foreign key", field_value[0])
                                 prepared_record[field_name] = False
                                 continue
                             # Si el primer elemento es un entero, usarlo (pero debería estar mapeado)
                             if isinstance(field_value[0], int):
-                                logger.warning(f"  ⚠ Campo many2one {field_name} viene como lista pero debería estar mapeado, usando ID: {field_value[0]}")
+                                logger.warning("  ⚠ Campo many2one %s viene como lista pero debería estar mapeado, usando ID: %s", field_name, field_value[0])
                                 field_value = field_value[0]
                             else:
                                 field_value = False
@@ -3031,178 +3460,142 @@ class MigrationScript:
                             field_value = False
                         else:
                             # Valor desconocido, establecer False para evitar errores
-                            logger.warning(f"  ⚠ Campo many2one {field_name} tiene formato desconocido: {type(field_value)}, estableciendo False")
-                            if field_name == 'user_id' and model == 'res.partner':
+                            logger.warning("  ⚠ Campo many2one %s tiene formato desconocido: %s, estableciendo False", field_name, type(field_value))
+                            if field_name == 'user_id' and is_res_partner:
                                 prepared_record[field_name] = False
                                 continue
                             else:
                                 continue
-                    
-                    # Incluir el campo solo si tiene un valor válido
-                    # Asegurar que el valor sea serializable (no objetos complejos)
-                    if isinstance(field_value, (dict, list)) and not isinstance(field_value, (str, int, float, bool, type(None))):
-                        # Si es un diccionario o lista compleja, convertir a formato válido
-                        # Para otros tipos (no many2one), omitir si no es serializable
-                        logger.warning(f"  ⚠ Campo {field_name} tiene valor no serializable: {type(field_value)}, omitiendo")
+                        
+                        # Aquí field_value ya es un ID entero o False: válido para Odoo sin más comprobaciones
+                        prepared_record[field_name] = field_value
                         continue
                     
-                    # Verificar que el valor sea de un tipo válido para Odoo
+                    # Incluir el campo solo si tiene un valor válido para Odoo (serializable, no objetos complejos)
                     if not isinstance(field_value, (str, int, float, bool, type(None))):
-                        logger.warning(f"  ⚠ Campo {field_name} tiene tipo inválido: {type(field_value)}, omitiendo")
+                        if isinstance(field_value, (dict, list)):
+                            # Para otros tipos (no many2one), omitir si no es serializable
+                            logger.warning("  ⚠ Campo %s tiene valor no serializable: %s, omitiendo", field_name, type(field_value))
+                        else:
+                            logger.warning("  ⚠ Campo %s tiene tipo inválido: %s, omitiendo", field_name, type(field_value))
                         continue
                     
                     # Incluir el campo
                     prepared_record[field_name] = field_value
                 
-                # Mapeo especial después de procesar todos los campos:
-                # quantity en contract.line se mapea a product_uom_qty en sale.subscription.line
-                if model == 'sale.subscription.line' and 'quantity' in record:
-                    prepared_record['product_uom_qty'] = record['quantity']
-                    # Eliminar quantity ya que no existe en v18
-                    if 'quantity' in prepared_record:
-                        del prepared_record['quantity']
-                    logger.debug(f"  [MAPEO CAMPO POST] quantity mapeado a product_uom_qty: {record['quantity']}")
-                
-                # specific_price en contract.line se mapea a price_unit en sale.subscription.line
-                if model == 'sale.subscription.line' and 'specific_price' in record:
-                    specific_price = record.get('specific_price')
-                    if specific_price is not None and specific_price is not False:
-                        prepared_record['price_unit'] = specific_price
-                        logger.debug(f"  [MAPEO CAMPO POST] specific_price mapeado a price_unit: {specific_price}")
-                    # Eliminar specific_price ya que no existe en v18
-                    if 'specific_price' in prepared_record:
-                        del prepared_record['specific_price']
+                # Mapeo especial después de procesar todos los campos: campos renombrados en v18
+                # (ej: quantity -> product_uom_qty en sale.subscription.line)
+                for src_field, dst_field, condition in field_renames:
+                    if src_field in record:
+                        value = record[src_field]
+                        if condition is None or condition(value):
+                            prepared_record[dst_field] = value
+                            logger.debug("  [MAPEO CAMPO POST] %s mapeado a %s: %s", src_field, dst_field, value)
+                        # Eliminar el campo v13 ya que no existe en v18
+                        prepared_record.pop(src_field, None)
                 
                 # Asegurar que campos requeridos tengan valores válidos (verificación final)
-                
-                # Asegurar que campos requeridos tengan valores válidos (verificación final)
-                # IMPORTANTE: Excluir campos con store=False (computed) incluso si son requeridos
-                for required_field in required_fields:
-                    # EXCLUIR campos sin store (computed) - no se pueden establecer en create()
-                    if required_field in no_store_fields:
-                        continue  # Saltar campos computed sin store
-                    
+                # IMPORTANTE: create_required_fields ya excluye los campos con store=False (computed)
+                # incluso si son requeridos: no se pueden establecer en create()
+                for required_field in create_required_fields:
                     # Verificar si el campo está presente y tiene un valor válido
                     field_value = prepared_record.get(required_field)
-                    field_info = v18_fields.get(required_field, {})
-                    field_type = field_info.get('type', '')
+                    field_type = field_type_map.get(required_field, '')
                     
                     # Verificar si el valor es None, False, o cadena vacía
-                    is_empty = (required_field not in prepared_record or 
-                               field_value is None or 
-                               field_value is False or 
-                               (isinstance(field_value, str) and not field_value.strip()))
+                    is_empty = (required_field not in prepared_record or _is_empty(field_value, field_type))
                     
                     # Log de depuración para pricelist_id
-                    if required_field == 'pricelist_id' and model == 'sale.subscription':
-                        logger.debug(f"  [DEBUG PRICELIST] Verificando {required_field} en {model} (contrato v13[{record_v13_id}]): en prepared_record={required_field in prepared_record}, valor={field_value}, is_empty={is_empty}")
+                    if required_field == 'pricelist_id' and is_sale_subscription:
+                        logger.debug("  [DEBUG PRICELIST] Verificando %s en %s (contrato v13[%s]): en prepared_record=%s, valor=%s, is_empty=%s", required_field, model, record_v13_id, required_field in prepared_record, field_value, is_empty)
                     
-                    # Caso especial: company_id requerido en res.users
-                    # (res.company no está en models_to_migrate.txt, pero company_id es requerido en v18)
-                    if is_empty and required_field == 'company_id' and model == 'res.users':
-                        # Buscar la compañía principal
-                        try:
-                            company_domain = []
-                            companies = self.v18_conn.search_read('res.company', company_domain, ['id'], limit=1)
-                            if companies:
-                                prepared_record[required_field] = companies[0]['id']
-                                logger.debug(f"  [VERIFICACIÓN FINAL] Campo requerido {required_field} en {model} sin valor (res.company no migrado), asignada compañía por defecto: {prepared_record[required_field]}")
-                            else:
-                                logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] No se encontró compañía por defecto para {required_field} en {model}")
-                        except Exception as e:
-                            logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] Error buscando compañía por defecto para {required_field} en {model}: {e}")
-                        continue  # Continuar con el siguiente campo
+                    if not is_empty:
+                        continue  # El campo ya tiene un valor válido
                     
-                    # Caso especial: uom_id requerido en product.template y product.product
-                    # (Unidad de medida por defecto: ID=1 'Units')
-                    if is_empty and required_field == 'uom_id' and model in ['product.template', 'product.product']:
-                        prepared_record[required_field] = 1
-                        logger.debug(f"  [VERIFICACIÓN FINAL] Campo requerido {required_field} en {model} sin valor, asignada unidad por defecto: 1 (Units)")
-                        continue  # Continuar con el siguiente campo
-                    
-                    # Caso especial: category_id requerido en uom.uom
-                    # (Categoría por defecto: ID=1 'Unit')
-                    if is_empty and required_field == 'category_id' and model == 'uom.uom':
-                        prepared_record[required_field] = 1
-                        logger.debug(f"  [VERIFICACIÓN FINAL] Campo requerido {required_field} en {model} sin valor, asignada categoría por defecto: 1 (Unit)")
+                    # Casos especiales con valor por defecto fijo (company_id en res.users, uom_id en
+                    # product.*, category_id en uom.uom): ver _REQUIRED_DEFAULTS
+                    required_default = _REQUIRED_DEFAULTS.get((model, required_field))
+                    if required_default is not None:
+                        default_provider, default_description = required_default
+                        default_value = default_provider(self)
+                        if default_value:
+                            prepared_record[required_field] = default_value
+                            logger.debug("  [VERIFICACIÓN FINAL] Campo requerido %s en %s sin valor, asignada %s", required_field, model, default_description)
+                        else:
+                            logger.warning("  ⚠ [VERIFICACIÓN FINAL] No se encontró valor por defecto para %s en %s", required_field, model)
                         continue  # Continuar con el siguiente campo
                     
                     # Caso especial: partner_id requerido en sale.subscription
                     # Se mapea desde v13 usando partner_mapping (debe estar mapeado antes)
-                    if is_empty and required_field == 'partner_id' and model == 'sale.subscription':
+                    if required_field == 'partner_id' and is_sale_subscription:
                         v13_partner_id = record.get('partner_id', False)
                         
                         # Extraer el ID de la tupla si viene como lista
-                        if isinstance(v13_partner_id, list) and len(v13_partner_id) >= 1:
-                            v13_partner_id = v13_partner_id[0]
+                        v13_partner_id = _unpack_m2o(v13_partner_id)[0]
                         
                         if not v13_partner_id:
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: partner_id requerido en sale.subscription (contrato v13[{record_v13_id}]) está vacío en el registro v13.")
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: partner_id requerido en sale.subscription (contrato v13[%s]) está vacío en el registro v13.", record_v13_id)
                             continue
                         
-                        # Cargar partner_mapping desde migration.tracking
-                        partner_mapping = self.v18_conn.get_migration_mapping('res.partner')
+                        # Cargar partner_mapping desde migration.tracking (una vez por batch)
+                        partner_mapping = self._get_cached_mapping('res.partner')
                         if not partner_mapping:
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se pudo cargar el mapeo de res.partner desde migration.tracking.")
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se pudo cargar el mapeo de res.partner desde migration.tracking.")
                             continue
                         
                         v13_id_str = str(v13_partner_id)
-                        if v13_id_str in partner_mapping:
-                            prepared_record[required_field] = partner_mapping[v13_id_str]
-                            logger.info(f"  [VERIFICACIÓN FINAL] ✓ Campo requerido {required_field} en {model} (contrato v13[{record_v13_id}]) mapeado desde v13: {v13_id_str} -> {prepared_record[required_field]}")
+                        mapped_partner_id = partner_mapping.get(_extract_v13_id(v13_partner_id))
+                        if mapped_partner_id is not None:
+                            prepared_record[required_field] = mapped_partner_id
+                            logger.info("  [VERIFICACIÓN FINAL] ✓ Campo requerido %s en %s (contrato v13[%s]) mapeado desde v13: %s -> %s", required_field, model, record_v13_id, v13_id_str, prepared_record[required_field])
                             continue
                         else:
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: partner_id v13[{v13_id_str}] del contrato v13[{record_v13_id}] NO está mapeado en res.partner. Mapeos disponibles: {len(partner_mapping)}.")
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: partner_id v13[%s] del contrato v13[%s] NO está mapeado en res.partner. Mapeos disponibles: %s.", v13_id_str, record_v13_id, len(partner_mapping))
                             continue
                     
                     # Caso especial: company_id requerido en sale.subscription
                     # Se mapea desde v13 usando company_mapping o se usa compañía por defecto
-                    if is_empty and required_field == 'company_id' and model == 'sale.subscription':
+                    if required_field == 'company_id' and is_sale_subscription:
                         v13_company_id = record.get('company_id', False)
                         
                         # Extraer el ID de la tupla si viene como lista
-                        if isinstance(v13_company_id, list) and len(v13_company_id) >= 1:
-                            v13_company_id = v13_company_id[0]
+                        v13_company_id = _unpack_m2o(v13_company_id)[0]
                         
                         # Intentar mapear desde v13 si existe
                         if v13_company_id:
-                            company_mapping = self.v18_conn.get_migration_mapping('res.company')
+                            company_mapping = self._get_cached_mapping('res.company')
                             if company_mapping:
                                 v13_id_str = str(v13_company_id)
-                                if v13_id_str in company_mapping:
-                                    prepared_record[required_field] = company_mapping[v13_id_str]
-                                    logger.info(f"  [VERIFICACIÓN FINAL] ✓ Campo requerido {required_field} en {model} (contrato v13[{record_v13_id}]) mapeado desde v13: {v13_id_str} -> {prepared_record[required_field]}")
+                                mapped_company_id = company_mapping.get(_extract_v13_id(v13_company_id))
+                                if mapped_company_id is not None:
+                                    prepared_record[required_field] = mapped_company_id
+                                    logger.info("  [VERIFICACIÓN FINAL] ✓ Campo requerido %s en %s (contrato v13[%s]) mapeado desde v13: %s -> %s", required_field, model, record_v13_id, v13_id_str, prepared_record[required_field])
                                     continue
                         
                         # Si no hay mapeo o no hay company_id en v13, usar compañía por defecto
-                        logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] company_id requerido en sale.subscription (contrato v13[{record_v13_id}]) sin mapeo. Usando compañía por defecto.")
-                        try:
-                            companies = self.v18_conn.search_read('res.company', [], ['id'], limit=1, order='id asc')
-                            if companies:
-                                prepared_record[required_field] = companies[0]['id']
-                                logger.info(f"  [VERIFICACIÓN FINAL] ✓ Campo requerido {required_field} en {model} (contrato v13[{record_v13_id}]) asignado compañía por defecto: {prepared_record[required_field]}")
-                                continue
-                            else:
-                                logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se encontró ninguna compañía para {required_field} en {model}")
-                                continue
-                        except Exception as e:
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: Error buscando compañía por defecto para {required_field} en {model}: {e}")
-                            continue
+                        logger.warning("  ⚠ [VERIFICACIÓN FINAL] company_id requerido en sale.subscription (contrato v13[%s]) sin mapeo. Usando compañía por defecto.", record_v13_id)
+                        default_company_id = self._get_default_company_id()
+                        if default_company_id:
+                            prepared_record[required_field] = default_company_id
+                            logger.info("  [VERIFICACIÓN FINAL] ✓ Campo requerido %s en %s (contrato v13[%s]) asignado compañía por defecto: %s", required_field, model, record_v13_id, prepared_record[required_field])
+                        else:
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se encontró ninguna compañía para %s en %s", required_field, model)
+                        continue
                     
                     # Caso especial: template_id requerido en sale.subscription
                     # Se determina basándose en recurring_rule_type y recurring_interval del contrato v13
-                    if is_empty and required_field == 'template_id' and model == 'sale.subscription':
+                    if required_field == 'template_id' and is_sale_subscription:
                         recurring_rule_type = record.get('recurring_rule_type', '')
                         recurring_interval = record.get('recurring_interval', 1)
                         template_id = self.get_template_id_for_contract(recurring_rule_type, recurring_interval)
                         prepared_record[required_field] = template_id
-                        logger.debug(f"  [VERIFICACIÓN FINAL] Campo requerido {required_field} en {model} determinado por recurrencia: rule_type={recurring_rule_type}, interval={recurring_interval} -> template_id={template_id}")
+                        logger.debug("  [VERIFICACIÓN FINAL] Campo requerido %s en %s determinado por recurrencia: rule_type=%s, interval=%s -> template_id=%s", required_field, model, recurring_rule_type, recurring_interval, template_id)
                         continue  # Continuar con el siguiente campo
                     
                     # Caso especial: pricelist_id requerido en sale.subscription
                     # Se mapea desde v13 usando pricelist_mapping (ya debería estar mapeado antes)
                     # Esta verificación solo aplica si todavía está vacío después del mapeo
-                    if is_empty and required_field == 'pricelist_id' and model == 'sale.subscription':
+                    if required_field == 'pricelist_id' and is_sale_subscription:
                         # Verificar si ya se mapeó en la sección anterior (no debería estar vacío)
                         # Si está vacío, intentar obtenerlo del registro v13 original
                         v13_pricelist_id = record.get('pricelist_id', False)
@@ -3215,310 +3608,198 @@ class MigrationScript:
                         # NOTA: Esto es aceptable si los precios de las líneas (subscription.line) en v13 
                         # coinciden con los precios de los productos en v18. El usuario debe verificar esto manualmente.
                         if not v13_pricelist_id:
-                            logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] Contrato v13[{record_v13_id}] no tiene pricelist_id asignado. Usando pricelist por defecto. NOTA: Verificar que los precios de las líneas (subscription.line) en v13 coincidan con los precios de los productos en v18.")
+                            logger.warning("  ⚠ [VERIFICACIÓN FINAL] Contrato v13[%s] no tiene pricelist_id asignado. Usando pricelist por defecto. NOTA: Verificar que los precios de las líneas (subscription.line) en v13 coincidan con los precios de los productos en v18.", record_v13_id)
                             try:
-                                # Buscar pricelist por defecto (generalmente es el primero o uno con nombre específico)
-                                pricelists = self.v18_conn.search_read('product.pricelist', [], ['id', 'name'], limit=1, order='id asc')
-                                if pricelists:
-                                    prepared_record[required_field] = pricelists[0]['id']
-                                    logger.info(f"  [VERIFICACIÓN FINAL] ✓ Campo requerido {required_field} en {model} (contrato v13[{record_v13_id}]) asignado pricelist por defecto: {prepared_record[required_field]} ({pricelists[0].get('name', 'N/A')})")
+                                # Pricelist por defecto (el de menor ID), consultado una sola vez en la migración
+                                default_pricelist = self._get_default_pricelist()
+                                if default_pricelist:
+                                    prepared_record[required_field] = default_pricelist['id']
+                                    logger.info("  [VERIFICACIÓN FINAL] ✓ Campo requerido %s en %s (contrato v13[%s]) asignado pricelist por defecto: %s (%s)", required_field, model, record_v13_id, prepared_record[required_field], default_pricelist.get('name', 'N/A'))
                                     continue
                                 else:
-                                    logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se encontró ningún pricelist para {required_field} en {model}")
+                                    logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se encontró ningún pricelist para %s en %s", required_field, model)
                                     continue
                             except Exception as e:
-                                logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: Error buscando pricelist por defecto para {required_field} en {model}: {e}")
+                                logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: Error buscando pricelist por defecto para %s en %s: %s", required_field, model, e)
                                 continue
                         
-                        # Cargar pricelist_mapping si no está cargado
-                        if not self.pricelist_mapping:
-                            self.pricelist_mapping = self.v18_conn.get_migration_mapping('product.pricelist')
-                            logger.info(f"  [VERIFICACIÓN FINAL] Cargado mapeo de product.pricelist: {len(self.pricelist_mapping)} registros")
-                        
-                        if not self.pricelist_mapping:
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se pudo cargar el mapeo de product.pricelist desde migration.tracking. Debe migrarse primero product.pricelist.")
+                        # pricelist_mapping se carga antes del bucle de registros
+                        if not pricelist_mapping:
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: No se pudo cargar el mapeo de product.pricelist desde migration.tracking. Debe migrarse primero product.pricelist.")
                             # NO asignar un valor por defecto, dejar que falle la creación
                             continue
                         
                         v13_id_str = str(v13_pricelist_id)
-                        if v13_id_str in self.pricelist_mapping:
-                            prepared_record[required_field] = self.pricelist_mapping[v13_id_str]
-                            logger.info(f"  [VERIFICACIÓN FINAL] ✓ Campo requerido {required_field} en {model} (contrato v13[{record_v13_id}]) mapeado desde v13: {v13_id_str} -> {prepared_record[required_field]}")
+                        mapped_pricelist_id = pricelist_mapping.get(_extract_v13_id(v13_pricelist_id))
+                        if mapped_pricelist_id is not None:
+                            prepared_record[required_field] = mapped_pricelist_id
+                            logger.info("  [VERIFICACIÓN FINAL] ✓ Campo requerido %s en %s (contrato v13[%s]) mapeado desde v13: %s -> %s", required_field, model, record_v13_id, v13_id_str, prepared_record[required_field])
                             continue
                         else:
                             # CRÍTICO: Si el pricelist_id de v13 no está mapeado, NO usar un valor por defecto
                             # Debe ser el mismo pricelist que viene de contract.contract
-                            available_ids = sorted(list(self.pricelist_mapping.keys()))[:20]
-                            logger.error(f"  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: pricelist_id v13[{v13_id_str}] del contrato v13[{record_v13_id}] NO está mapeado en product.pricelist. Mapeos disponibles: {len(self.pricelist_mapping)}. Ejemplos: {available_ids}. Debe migrarse primero product.pricelist o verificar que el pricelist_id v13[{v13_id_str}] exista en v18.")
+                            available_ids = heapq.nsmallest(20, pricelist_mapping)
+                            logger.error("  ✗ [VERIFICACIÓN FINAL] ERROR CRÍTICO: pricelist_id v13[%s] del contrato v13[%s] NO está mapeado en product.pricelist. Mapeos disponibles: %s. Ejemplos: %s. Debe migrarse primero product.pricelist o verificar que el pricelist_id v13[%s] exista en v18.", v13_id_str, record_v13_id, len(pricelist_mapping), available_ids, v13_id_str)
                             # NO asignar un valor por defecto, dejar que falle la creación para que el error sea visible
                             continue
                     
-                    # Si el campo no está presente o está null/vacío, asignar valor por defecto
-                    if is_empty:
-                        # Asignar valor por defecto según el tipo
+                    # El campo no está presente o está null/vacío: asignar valor por defecto según el tipo
+                    if required_field == 'name':
+                        record_id = record.get('id', 'Unknown')
+                        if is_res_partner:
+                            # Intentar usar display_name como fallback
+                            display_name = record.get('display_name')
+                            
+                            if display_name and isinstance(display_name, str) and display_name.strip():
+                                prepared_record[required_field] = display_name
+                            else:
+                                # Para res.partner, usar espacio en blanco si no hay nombre
+                                prepared_record[required_field] = " "
+                        else:
+                            prepared_record[required_field] = f"{model} {record_id}"
+                        logger.warning("  ⚠ Campo requerido '%s' vacío en %s (ID: %s), asignado valor por defecto: %s", required_field, model, record_id, prepared_record[required_field])
+                    elif field_type == 'many2one':
+                        prepared_record[required_field] = False
+                    elif field_type in ('integer', 'float'):
+                        prepared_record[required_field] = 0
+                    elif field_type == 'boolean':
+                        prepared_record[required_field] = False
+                    elif field_type in ('char', 'text'):
+                        # Para campos de texto requeridos, usar valor por defecto
                         if required_field == 'name':
                             record_id = record.get('id', 'Unknown')
-                            if model == 'res.partner':
-                                # Intentar usar display_name como fallback
-                                display_name = record.get('display_name')
-                                
-                                if display_name and isinstance(display_name, str) and display_name.strip():
-                                    prepared_record[required_field] = display_name
-                                else:
-                                    # Para res.partner, usar espacio en blanco si no hay nombre
-                                    prepared_record[required_field] = " "
-                            else:
-                                prepared_record[required_field] = f"{model} {record_id}"
-                            logger.warning(f"  ⚠ Campo requerido '{required_field}' vacío en {model} (ID: {record_id}), asignado valor por defecto: {prepared_record[required_field]}")
-                        elif field_type == 'many2one':
-                            prepared_record[required_field] = False
-                        elif field_type in ['integer', 'float']:
-                            prepared_record[required_field] = 0
-                        elif field_type == 'boolean':
-                            prepared_record[required_field] = False
-                        elif field_type in ['char', 'text']:
-                            # Para campos de texto requeridos, usar valor por defecto
-                            if required_field == 'name':
-                                record_id = record.get('id', 'Unknown')
-                                prepared_record[required_field] = f"{model} {record_id}"
-                            else:
-                                prepared_record[required_field] = ""
-                        # Para otros tipos, se omiten (pueden causar errores)
+                            prepared_record[required_field] = f"{model} {record_id}"
+                        else:
+                            prepared_record[required_field] = ""
+                    # Para otros tipos, se omiten (pueden causar errores)
                 
                 # Verificación final crítica: asegurar que 'name' siempre tenga un valor válido
-                if 'name' in required_fields:
+                if name_required:
                     final_name = prepared_record.get('name')
                     if not final_name or (isinstance(final_name, str) and not final_name.strip()):
                         record_id = record.get('id', 'Unknown')
-                        if model == 'res.partner':
+                        if is_res_partner:
                             # Para res.partner, usar espacio en blanco si no hay nombre
                             prepared_record['name'] = " "
                         else:
                             prepared_record['name'] = f"{model} {record_id}"
-                        logger.error(f"  ✗ ERROR CRÍTICO: Campo 'name' quedó vacío después de todo el procesamiento en {model} (ID: {record_id}), forzando valor: {prepared_record['name']}")
+                        logger.error("  ✗ ERROR CRÍTICO: Campo 'name' quedó vacío después de todo el procesamiento en %s (ID: %s), forzando valor: %s", model, record_id, prepared_record['name'])
                 
                 # VERIFICACIÓN FINAL CRÍTICA: user_id en res.partner debe ser False si no está mapeado correctamente
                 # Esto evita errores de foreign key constraint
-                if model == 'res.partner' and 'user_id' in prepared_record:
-                    user_id_value = prepared_record.get('user_id')
-                    # Si user_id no es False y no es un entero válido, establecerlo a False
-                    if user_id_value is not False and user_id_value is not None:
-                        # Verificar si es un entero válido (ya mapeado)
-                        if isinstance(user_id_value, int) and user_id_value > 0:
-                            # Es un ID válido, mantenerlo
-                            pass
-                        elif isinstance(user_id_value, (list, tuple)) and len(user_id_value) > 0:
+                if is_res_partner and 'user_id' in prepared_record:
+                    user_id_value = prepared_record['user_id']
+                    # Solo False o un ID entero positivo (ya mapeado) son válidos: cualquier otro valor -> False
+                    # (type() is int excluye bool: True no es un ID de usuario)
+                    if user_id_value is not False and not (type(user_id_value) is int and user_id_value > 0):
+                        if isinstance(user_id_value, (list, tuple)) and user_id_value:
                             # Viene como lista [id, name], pero no debería llegar aquí si ya fue mapeado
-                            # Establecer a False para evitar error
-                            logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] user_id en res.partner viene como lista {user_id_value}, estableciendo False para evitar error de foreign key")
-                            prepared_record['user_id'] = False
-                        else:
-                            # Cualquier otro valor, establecer a False
-                            logger.warning(f"  ⚠ [VERIFICACIÓN FINAL] user_id en res.partner tiene valor inválido {user_id_value} (tipo: {type(user_id_value)}), estableciendo False")
-                            prepared_record['user_id'] = False
-                    elif user_id_value is None:
-                        # None no es válido, establecer a False
+                            logger.warning("  ⚠ [VERIFICACIÓN FINAL] user_id en res.partner viene como lista %s, estableciendo False para evitar error de foreign key", user_id_value)
+                        elif user_id_value is not None:
+                            logger.warning("  ⚠ [VERIFICACIÓN FINAL] user_id en res.partner tiene valor inválido %s (tipo: %s), estableciendo False", user_id_value, type(user_id_value))
                         prepared_record['user_id'] = False
                 
                 # Guardar el registro preparado junto con sus campos many2many
                 # Asegurar que campos nuevos requeridos en v18 se agreguen automáticamente
                 # para modelos de productos
-                if model in ['product.template', 'product.product']:
-                    # Campos nuevos requeridos en v18
-                    if 'service_tracking' not in prepared_record:
-                        prepared_record['service_tracking'] = 'no'
-                        logger.debug(f"  [DEFAULT] Agregado campo requerido service_tracking='no' para {model}")
-                    if 'purchase_line_warn' not in prepared_record:
-                        prepared_record['purchase_line_warn'] = 'no-message'
-                        logger.debug(f"  [DEFAULT] Agregado campo requerido purchase_line_warn='no-message' para {model}")
-                    if 'ticket_active' not in prepared_record:
-                        prepared_record['ticket_active'] = False
-                        logger.debug(f"  [DEFAULT] Agregado campo requerido ticket_active=False para {model}")
+                if is_product:
+                    # Campos nuevos requeridos en v18 (solo si no vienen ya en el registro)
+                    prepared_record.setdefault('service_tracking', 'no')
+                    prepared_record.setdefault('purchase_line_warn', 'no-message')
+                    prepared_record.setdefault('ticket_active', False)
                     
                     # uom_id es requerido en v18 - asignar unidad por defecto si falta o es False/None
                     uom_id_value = prepared_record.get('uom_id')
-                    if not uom_id_value or uom_id_value is False:
+                    if not uom_id_value:
                         # Unidad de medida por defecto: ID=1 ('Units')
-                        prepared_record['uom_id'] = 1
-                        logger.debug(f"  [DEFAULT] Agregado campo requerido uom_id=1 (Units) para {model} (valor original: {uom_id_value})")
+                        logger.debug("  [DEFAULT] Agregado campo requerido uom_id=1 (Units) para %s (valor original: %s)", model, uom_id_value)
+                        uom_id_value = prepared_record['uom_id'] = 1
                     
-                    # uom_po_id también puede necesitar valor por defecto si falta
-                    uom_po_id_value = prepared_record.get('uom_po_id')
-                    if not uom_po_id_value or uom_po_id_value is False:
-                        # Usar la misma unidad que uom_id
-                        prepared_record['uom_po_id'] = prepared_record.get('uom_id', 1)
-                        logger.debug(f"  [DEFAULT] Agregado campo uom_po_id={prepared_record['uom_po_id']} (mismo que uom_id) para {model}")
+                    # uom_po_id también puede necesitar valor por defecto si falta: usar la misma unidad que uom_id
+                    if not prepared_record.get('uom_po_id'):
+                        prepared_record['uom_po_id'] = uom_id_value
                 
-                elif model == 'product.pricelist.item':
+                elif is_pricelist_item:
                     # Campo nuevo requerido en v18: display_applied_on
                     if 'display_applied_on' not in prepared_record:
                         # Mapear desde applied_on
                         applied_on = prepared_record.get('applied_on', record.get('applied_on', ''))
-                        if applied_on == '1_product':
-                            display_applied_on = '1_product'
-                        elif applied_on == '2_product_category':
-                            display_applied_on = '2_product_category'
-                        elif applied_on == '0_product_variant':
-                            display_applied_on = '1_product'  # Product variant -> Product
-                        elif applied_on == '3_global':
-                            display_applied_on = '1_product'  # Global -> Product (por defecto)
-                        else:
-                            display_applied_on = '1_product'  # Valor por defecto
+                        display_applied_on = _DISPLAY_APPLIED_ON_MAP.get(applied_on, '1_product')
                         prepared_record['display_applied_on'] = display_applied_on
-                        logger.debug(f"  [DEFAULT] Agregado campo requerido display_applied_on='{display_applied_on}' (desde applied_on='{applied_on}') para {model}")
+                        logger.debug("  [DEFAULT] Agregado campo requerido display_applied_on='%s' (desde applied_on='%s') para %s", display_applied_on, applied_on, model)
                 
                 # Caso especial: Calcular stage_id para sale.subscription basándose en condiciones
-                if model == 'sale.subscription':
-                    from datetime import datetime, date
-                    
+                if is_sale_subscription:
                     # Verificar que stage_id esté en los campos válidos
                     if 'stage_id' not in valid_field_names:
-                        logger.warning(f"  [ESTADO] Campo 'stage_id' no encontrado en campos válidos de sale.subscription, estableciendo In progress (ID=3) por defecto")
+                        logger.warning("  [ESTADO] Campo 'stage_id' no encontrado en campos válidos de sale.subscription, estableciendo In progress (ID=3) por defecto")
                         prepared_record['stage_id'] = 3
                     else:
                         # Obtener valores de date_end y recurring_next_date
                         date_end = prepared_record.get('date_end') or record.get('date_end')
                         recurring_next_date = prepared_record.get('recurring_next_date') or record.get('recurring_next_date')
                         
-                        # Inicializar stage_id con valor por defecto (In progress = 3)
-                        stage_id = 3
-                        stage_name = 'In progress'
-                        
-                        # Convertir date_end a objeto date si es string
-                        if isinstance(date_end, str):
-                            try:
-                                date_end = datetime.strptime(date_end, '%Y-%m-%d').date()
-                            except:
-                                try:
-                                    date_end = datetime.strptime(date_end.split(' ')[0], '%Y-%m-%d').date()
-                                except:
-                                    date_end = None
-                        elif date_end:
-                            # Si es datetime, convertir a date
-                            if isinstance(date_end, datetime):
-                                date_end = date_end.date()
-                        
-                        # Convertir recurring_next_date a objeto date si es string
-                        # IMPORTANTE: Verificar si es False o string vacío ANTES de convertir
-                        if recurring_next_date is False or recurring_next_date is None:
-                            recurring_next_date = False
-                        elif isinstance(recurring_next_date, str):
-                            # Si es string vacío, tratarlo como False
-                            if not recurring_next_date.strip():
-                                recurring_next_date = False
-                            else:
-                                try:
-                                    recurring_next_date = datetime.strptime(recurring_next_date, '%Y-%m-%d').date()
-                                except:
-                                    try:
-                                        recurring_next_date = datetime.strptime(recurring_next_date.split(' ')[0], '%Y-%m-%d').date()
-                                    except:
-                                        recurring_next_date = False
-                        elif recurring_next_date:
-                            # Si es datetime, convertir a date
-                            if isinstance(recurring_next_date, datetime):
-                                recurring_next_date = recurring_next_date.date()
-                        else:
-                            recurring_next_date = False
-                        
-                        # Obtener fecha actual
-                        today = date.today()
+                        # Convertir date_end y recurring_next_date a objetos date
+                        # (False si están vacíos, son string vacío o no son fechas válidas)
+                        date_end = _parse_iso_date(date_end)
+                        recurring_next_date = _parse_iso_date(recurring_next_date)
                         
                         # Calcular stage_id según las condiciones:
-                        # "In progress": date_end >= hoy O (date_end == False Y recurring_next_date != False)
-                        # "Closed": date_end < hoy Y recurring_next_date == False
+                        # "In progress": date_end >= hoy O recurring_next_date != False
+                        # "Closed": (date_end == False O date_end < hoy) Y recurring_next_date == False
                         try:
-                            if date_end is None or date_end is False:
-                                # date_end es False o None
-                                if recurring_next_date and recurring_next_date is not False:
-                                    # date_end == False Y recurring_next_date != False -> In progress (ID=3)
-                                    stage_id = 3
-                                    stage_name = 'In progress'
-                                else:
-                                    # Si no hay recurring_next_date, usar Closed (ID=4)
-                                    stage_id = 4
-                                    stage_name = 'Closed'
-                            else:
-                                # date_end tiene valor
-                                if date_end >= today:
-                                    # date_end >= hoy -> In progress (ID=3)
-                                    stage_id = 3
-                                    stage_name = 'In progress'
-                                else:
-                                    # date_end < hoy
-                                    if recurring_next_date is None or recurring_next_date is False:
-                                        # date_end < hoy Y recurring_next_date == False -> Closed (ID=4)
-                                        stage_id = 4
-                                        stage_name = 'Closed'
-                                    else:
-                                        # date_end < hoy pero recurring_next_date != False -> In progress (ID=3)
-                                        stage_id = 3
-                                        stage_name = 'In progress'
-                        except Exception as e:
-                            logger.warning(f"  [ESTADO] Error calculando stage_id para sale.subscription (ID v13: {record_v13_id}): {e}, usando In progress (ID=3) por defecto")
-                            stage_id = 3
-                            stage_name = 'In progress'
+                            in_progress = bool(recurring_next_date) or (date_end is not False and date_end >= today)
+                        except TypeError as e:
+                            logger.warning("  [ESTADO] Error calculando stage_id para sale.subscription (ID v13: %s): %s, usando In progress (ID=3) por defecto", record_v13_id, e)
+                            in_progress = True
+                        stage_id, stage_name = (3, 'In progress') if in_progress else (4, 'Closed')
                         
                         # IMPORTANTE: Agregar stage_id directamente al prepared_record
                         # Esto se hace DESPUÉS de procesar todos los campos del registro original
                         prepared_record['stage_id'] = stage_id
-                        logger.info(f"  [ESTADO] ✓ stage_id establecido para sale.subscription (ID v13: {record_v13_id}): {stage_id} ({stage_name}) (date_end={date_end}, recurring_next_date={recurring_next_date}, hoy={today})")
+                        logger.info("  [ESTADO] ✓ stage_id establecido para sale.subscription (ID v13: %s): %s (%s) (date_end=%s, recurring_next_date=%s, hoy=%s)", record_v13_id, stage_id, stage_name, date_end, recurring_next_date, today)
                 
                 # Asegurar que stage_id esté establecido para sale.subscription ANTES de agregar a prepared_records
-                if model == 'sale.subscription' and 'stage_id' not in prepared_record:
+                if is_sale_subscription and 'stage_id' not in prepared_record:
                     # Si por alguna razón no se estableció, usar In progress (ID=3) como defecto
                     prepared_record['stage_id'] = 3
-                    logger.warning(f"  [ESTADO] ⚠ stage_id no estaba establecido para sale.subscription (ID v13: {record_v13_id}), estableciendo In progress (ID=3) como defecto")
+                    logger.warning("  [ESTADO] ⚠ stage_id no estaba establecido para sale.subscription (ID v13: %s), estableciendo In progress (ID=3) como defecto", record_v13_id)
                 
                 # Agregar prefijo "OLDV13:" al nombre de productos (product.template y product.product)
-                if model in ['product.template', 'product.product'] and 'name' in prepared_record:
-                    current_name = prepared_record['name']
-                    if current_name and isinstance(current_name, str) and not current_name.startswith('OLDV13:'):
-                        prepared_record['name'] = f"OLDV13: {current_name}"
-                        logger.debug(f"  [PREFIJO] Agregado prefijo 'OLDV13:' al nombre de {model} (ID v13: {record_v13_id}): '{current_name}' -> '{prepared_record['name']}'")
-                
-                # Agregar etiqueta "OLDv13" a productos (product.template y product.product)
-                if model in ['product.template', 'product.product']:
-                    # Obtener o crear la etiqueta "OLDv13" si no está cargada
-                    if self.oldv13_tag_id is None:
-                        self.oldv13_tag_id = self.get_or_create_oldv13_tag()
+                if is_product:
+                    current_name = prepared_record.get('name')
+                    if isinstance(current_name, str) and current_name and not current_name.startswith(_OLDV13_MARK):
+                        prepared_record['name'] = _OLDV13_PREFIX + current_name
+                        logger.debug("  [PREFIJO] Agregado prefijo 'OLDV13:' al nombre de %s (ID v13: %s): '%s' -> '%s'", model, record_v13_id, current_name, prepared_record['name'])
                     
-                    if self.oldv13_tag_id:
+                    # Agregar etiqueta "OLDv13" a productos (product.template y product.product)
+                    if oldv13_tag_id:
                         # Agregar la etiqueta a product_tag_ids usando m2m_fields
-                        if 'product_tag_ids' not in m2m_fields:
-                            m2m_fields['product_tag_ids'] = []
+                        product_tag_ids = m2m_fields.setdefault('product_tag_ids', [])
                         
                         # Agregar el ID de la etiqueta si no está ya presente
-                        if self.oldv13_tag_id not in m2m_fields['product_tag_ids']:
-                            m2m_fields['product_tag_ids'].append(self.oldv13_tag_id)
-                            logger.debug(f"  [ETIQUETA] Agregada etiqueta 'OLDv13' (ID: {self.oldv13_tag_id}) a {model} (ID v13: {record_v13_id})")
-                    else:
-                        logger.warning(f"  [ETIQUETA] ⚠ No se pudo obtener/crear etiqueta 'OLDv13' para {model} (ID v13: {record_v13_id})")
+                        if oldv13_tag_id not in product_tag_ids:
+                            product_tag_ids.append(oldv13_tag_id)
+                            logger.debug("  [ETIQUETA] Agregada etiqueta 'OLDv13' (ID: %s) a %s (ID v13: %s)", oldv13_tag_id, model, record_v13_id)
                 
-                prepared_records.append({
-                    'record': prepared_record,
-                    'm2m_fields': m2m_fields,
-                    'v13_id': record.get('id')
-                })
+                yield PreparedRecord(prepared_record, m2m_fields, record.get('id'), uom_name_changes)
+                yielded_count += 1
             
             # Log resumido de campos removidos si hay alguno
             if removed_fields_count:
                 total_removed_fields = len(removed_fields_count)
                 logger.info(f"[PREPARACIÓN] {total_removed_fields} campos removidos de {model} (no existen en v18 o son readonly/computed)")
             
-            return prepared_records
-            
         except Exception as e:
             logger.warning(f"⚠ Error preparando registros para {model}: {e}")
             logger.warning("⚠ Usando registros sin validación (puede causar errores)")
-            # En caso de error, retornar registros con limpieza básica
+            # En caso de error, entregar los registros restantes con limpieza básica
+            # (los ya entregados no se repiten)
             system_fields = {'id', 'create_uid', 'write_uid', 'create_date', 'write_date'}
-            prepared_records = []
-            for record in records:
+            for record in records[yielded_count:]:
                 prepared_record = {k: v for k, v in record.items() 
                                  if k not in system_fields and v is not None}
-                prepared_records.append(prepared_record)
-            return prepared_records
+                yield PreparedRecord(prepared_record, {}, record.get('id'))
     
     def _register_uom_name_changes(self, uom_name_changes: List[Dict], batch_id: str = None):
         """
@@ -3546,16 +3827,19 @@ class MigrationScript:
             
             if tracking_data:
                 logger.info(f"[UOM NAME CHANGE] Registrando {len(tracking_data)} cambios de nombre de unidades en migration.tracking...")
-                self.v18_conn.models.execute_kw(
-                    self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                    'migration.tracking', 'create',
-                    [tracking_data]
-                )
+                # Un solo create multi-registro por bloque (limita el tamaño del payload XML-RPC)
+                chunk_size = 500
+                for start in range(0, len(tracking_data), chunk_size):
+                    self.v18_conn.models.execute_kw(
+                        self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
+                        'migration.tracking', 'create',
+                        [tracking_data[start:start + chunk_size]]
+                    )
                 logger.info(f"[UOM NAME CHANGE] ✓ {len(tracking_data)} cambios de nombre registrados en migration.tracking")
         except Exception as e:
             logger.warning(f"[UOM NAME CHANGE] ⚠ Error registrando cambios de nombre en migration.tracking: {e}")
     
-    def map_parent_id(self, records: List[Dict], model: str) -> List[Dict]:
+    def map_parent_id(self, records: List[Dict], model: str, copy: bool = False) -> List[Dict]:
         """
         Mapea parent_id de v13 a v18 usando migration.tracking.
         En modo test, simula el mapeo usando los IDs v13 como si fueran v18.
@@ -3563,6 +3847,7 @@ class MigrationScript:
         Args:
             records: Lista de registros a mapear
             model: Nombre del modelo (el mismo modelo, parent_id apunta al mismo modelo)
+            copy: Si True, mapea sobre copias; por defecto modifica los registros en sitio
         
         Returns:
             Lista de registros con parent_id mapeado
@@ -3574,7 +3859,7 @@ class MigrationScript:
             mapped_count = 0
             
             for record in records:
-                mapped_record = record.copy()
+                mapped_record = record.copy() if copy else record
                 
                 if 'parent_id' in mapped_record:
                     v13_parent_id = mapped_record['parent_id']
@@ -3593,18 +3878,18 @@ class MigrationScript:
                 mapped_records.append(mapped_record)
             
             if mapped_count > 0:
-                logger.info(f"  [MODO TEST] ✓ Simulados {mapped_count} campos parent_id")
+                logger.info("  [MODO TEST] ✓ Simulados %s campos parent_id", mapped_count)
             
             return mapped_records
         
         # Obtener mapeo del mismo modelo (parent_id apunta al mismo modelo)
-        mapping = self.v18_conn.get_migration_mapping(model)
+        mapping = self._get_cached_mapping(model)
         
         if not mapping:
-            logger.warning(f"  ⚠ No se encontró mapeo para {model}, no se mapeará parent_id")
+            logger.warning("  ⚠ No se encontró mapeo para %s, no se mapeará parent_id", model)
             return records
         
-        logger.info(f"  Mapeo cargado para parent_id -> {model}: {len(mapping)} registros")
+        logger.info("  Mapeo cargado para parent_id -> %s: %s registros", model, len(mapping))
         
         # Mapear parent_id en los registros
         mapped_records = []
@@ -3612,7 +3897,7 @@ class MigrationScript:
         not_mapped_count = 0
         
         for record in records:
-            mapped_record = record.copy()
+            mapped_record = record.copy() if copy else record
             
             if 'parent_id' in mapped_record:
                 v13_parent_id = mapped_record['parent_id']
@@ -3624,39 +3909,38 @@ class MigrationScript:
                 # 3. Como número directo desde JSON
                 # 4. Como False o None (sin parent)
                 
-                if v13_parent_id and isinstance(v13_parent_id, (list, tuple)) and len(v13_parent_id) > 0:
-                    # Es una lista/tupla, tomar el primer elemento (el ID)
+                if type(v13_parent_id) is list and v13_parent_id:
+                    # Es una lista (caso dominante), tomar el primer elemento (el ID)
                     v13_parent_id_value = v13_parent_id[0]
-                elif v13_parent_id and isinstance(v13_parent_id, (int, str)):
-                    # Es un número o string directo
-                    v13_parent_id_value = int(v13_parent_id) if isinstance(v13_parent_id, str) else v13_parent_id
                 elif v13_parent_id is False or v13_parent_id is None:
                     # Sin parent, mantener False
                     mapped_records.append(mapped_record)
                     continue
                 else:
-                    # Formato desconocido, mantener como está
-                    logger.debug(f"  Formato desconocido para parent_id: {type(v13_parent_id)} = {v13_parent_id}")
-                    mapped_records.append(mapped_record)
-                    continue
+                    # Tupla o número/string directo
+                    v13_parent_id_value = _extract_v13_id(v13_parent_id)
+                    if v13_parent_id_value is None:
+                        # Formato desconocido, mantener como está
+                        logger.debug("  Formato desconocido para parent_id: %s = %s", type(v13_parent_id), v13_parent_id)
+                        mapped_records.append(mapped_record)
+                        continue
                 
                 # Mapear el ID de v13 a v18
                 if v13_parent_id_value is not None:
-                    v13_parent_id_str = str(v13_parent_id_value)
-                    if v13_parent_id_str in mapping:
-                        v18_parent_id = mapping[v13_parent_id_str]
+                    v18_parent_id = mapping.get(v13_parent_id_value)
+                    if v18_parent_id is not None:
                         mapped_record['parent_id'] = v18_parent_id
                         mapped_count += 1
-                        logger.debug(f"  Mapeado parent_id: {v13_parent_id_value} (v13) -> {v18_parent_id} (v18)")
+                        logger.debug("  Mapeado parent_id: %s (v13) -> %s (v18)", v13_parent_id_value, v18_parent_id)
                     else:
                         # Si no hay mapeo, poner False (sin parent) y registrar
-                        logger.warning(f"  ⚠ No se encontró mapeo para parent_id={v13_parent_id_value} en {model} (v13_id no migrado aún)")
+                        logger.warning("  ⚠ No se encontró mapeo para parent_id=%s en %s (v13_id no migrado aún)", v13_parent_id_value, model)
                         mapped_record['parent_id'] = False
                         not_mapped_count += 1
                 else:
                     # No se pudo extraer el ID, mantener False
                     mapped_record['parent_id'] = False
-                    logger.debug(f"  No se pudo extraer ID de parent_id: {v13_parent_id}")
+                    logger.debug("  No se pudo extraer ID de parent_id: %s", v13_parent_id)
             else:
                 # No hay parent_id en el registro, mantener como está
                 pass
@@ -3664,14 +3948,14 @@ class MigrationScript:
             mapped_records.append(mapped_record)
         
         if mapped_count > 0:
-            logger.info(f"  ✓ Mapeados {mapped_count} campos parent_id")
+            logger.info("  ✓ Mapeados %s campos parent_id", mapped_count)
         if not_mapped_count > 0:
-            logger.warning(f"  ⚠ {not_mapped_count} campos parent_id no pudieron mapearse (el padre no está migrado aún, se crearán sin parent)")
+            logger.warning("  ⚠ %s campos parent_id no pudieron mapearse (el padre no está migrado aún, se crearán sin parent)", not_mapped_count)
         
         return mapped_records
     
     def map_many2one_ids(self, records: List[Dict], model: str, 
-                        models_list: List[str]) -> List[Dict]:
+                        models_list: List[str], copy: bool = False) -> List[Dict]:
         """
         Mapea IDs de campos many2one de v13 a v18 usando migration.tracking.
         Agrega logging detallado para diagnosticar problemas de mapeo.
@@ -3683,6 +3967,8 @@ class MigrationScript:
             records: Lista de registros a mapear
             model: Nombre del modelo en v18
             models_list: Lista de modelos a migrar
+            copy: Si True, mapea sobre copias; por defecto modifica los registros en sitio
+                (el batch no se reutiliza después del mapeo)
         
         Returns:
             Lista de registros con IDs mapeados
@@ -3694,27 +3980,25 @@ class MigrationScript:
         # Usar v13_model para obtener los campos desde v13 (donde están los registros originales)
         try:
             many2one_fields = self.get_many2one_fields_info(v13_model, self.v13_conn)
-            logger.debug(f"[MAPEO M2O] Campos many2one obtenidos desde v13 para {v13_model} (v13) -> {model} (v18)")
+            logger.debug("[MAPEO M2O] Campos many2one obtenidos desde v13 para %s (v13) -> %s (v18)", v13_model, model)
         except Exception as e:
             error_msg = str(e)
             # Si el error es porque el modelo no existe, informar correctamente
             if "doesn't exist" in error_msg.lower() or "object" in error_msg.lower() and "exist" in error_msg.lower():
-                logger.warning(f"[MAPEO M2O] El modelo {v13_model} (v13) no existe en v13. Esto puede ser normal si es un modelo nuevo en v18.")
+                logger.warning("[MAPEO M2O] El modelo %s (v13) no existe en v13. Esto puede ser normal si es un modelo nuevo en v18.", v13_model)
             else:
-                logger.warning(f"[MAPEO M2O] Error obteniendo campos many2one para {v13_model} (v13): {e}")
+                logger.warning("[MAPEO M2O] Error obteniendo campos many2one para %s (v13): %s", v13_model, e)
             # NO intentar obtener desde v18 porque los registros vienen de v13
             # Si el modelo no existe en v13, no hay campos many2one que mapear
             many2one_fields = {}
-            logger.debug(f"[MAPEO M2O] Usando campos many2one vacíos para {model}")
+            logger.debug("[MAPEO M2O] Usando campos many2one vacíos para %s", model)
         
         # Excluir parent_id (se maneja por separado)
-        if 'parent_id' in many2one_fields:
-            del many2one_fields['parent_id']
+        many2one_fields.pop('parent_id', None)
         
         # Excluir category_id para uom.uom (se maneja por separado con mapeo especial)
-        if model == 'uom.uom' and 'category_id' in many2one_fields:
-            del many2one_fields['category_id']
-            logger.debug(f"[MAPEO M2O] Excluyendo category_id de uom.uom (se procesa con mapeo especial de categorías UoM)")
+        if model == 'uom.uom' and many2one_fields.pop('category_id', None) is not None:
+            logger.debug("[MAPEO M2O] Excluyendo category_id de uom.uom (se procesa con mapeo especial de categorías UoM)")
         
         # Caso especial: contract_id en sale.subscription.line debe mapearse a sale_subscription_id
         # usando el mapeo de sale.subscription (contract.contract -> sale.subscription)
@@ -3724,45 +4008,42 @@ class MigrationScript:
             has_contract_id = any('contract_id' in record for record in records)
             if has_contract_id:
                 # Mapear contract_id a sale_subscription_id usando mapeo de sale.subscription
-                subscription_mapping = self.v18_conn.get_migration_mapping('sale.subscription')
+                subscription_mapping = self._get_cached_mapping('sale.subscription')
                 if subscription_mapping:
-                    logger.info(f"[MAPEO M2O] Mapeando contract_id -> sale_subscription_id para {model} usando mapeo de sale.subscription ({len(subscription_mapping)} registros)")
-                    mapped_count = 0
-                    not_mapped_count = 0
-                    for record in records:
-                        contract_id = record.get('contract_id', False)
-                        if contract_id:
-                            # Extraer el ID si viene como tupla [id, name]
-                            if isinstance(contract_id, list) and len(contract_id) >= 1:
-                                contract_id = contract_id[0]
-                            if contract_id:
-                                v13_id_str = str(contract_id)
-                                if v13_id_str in subscription_mapping:
-                                    record['sale_subscription_id'] = subscription_mapping[v13_id_str]
-                                    mapped_count += 1
-                                    logger.debug(f"  [MAPEO M2O] contract_id v13[{v13_id_str}] -> sale_subscription_id v18[{record['sale_subscription_id']}]")
-                                else:
-                                    logger.warning(f"  ⚠ [MAPEO M2O] contract_id v13[{v13_id_str}] no encontrado en mapeo de sale.subscription")
-                                    not_mapped_count += 1
-                                    # Si no hay mapeo, establecer False para evitar errores
-                                    record['sale_subscription_id'] = False
-                    logger.info(f"[MAPEO M2O] ✓ Mapeados {mapped_count} campos contract_id -> sale_subscription_id, {not_mapped_count} sin mapeo")
+                    logger.info("[MAPEO M2O] Mapeando contract_id -> sale_subscription_id para %s usando mapeo de sale.subscription (%s registros)", model, len(subscription_mapping))
                 else:
-                    logger.warning(f"[MAPEO M2O] ⚠ No se encontró mapeo de sale.subscription para mapear contract_id")
-                    # Establecer sale_subscription_id como False para todos los registros
-                    for record in records:
-                        if 'contract_id' in record:
-                            record['sale_subscription_id'] = False
-                
-                # Eliminar contract_id ya que no existe en v18
+                    logger.warning("[MAPEO M2O] ⚠ No se encontró mapeo de sale.subscription para mapear contract_id")
+                mapped_count = 0
+                not_mapped_count = 0
                 for record in records:
-                    if 'contract_id' in record:
-                        del record['contract_id']
+                    # Eliminar contract_id (no existe en v18) y mapearlo en el mismo paso
+                    contract_id = record.pop('contract_id', _MISS)
+                    if contract_id is _MISS:
+                        continue
+                    if not subscription_mapping:
+                        # Sin mapeo, establecer sale_subscription_id como False
+                        record['sale_subscription_id'] = False
+                        continue
+                    # Extraer el ID si viene como tupla [id, name]
+                    contract_id = _unpack_m2o(contract_id)[0]
+                    if not contract_id:
+                        continue
+                    sale_subscription_id = subscription_mapping.get(_extract_v13_id(contract_id))
+                    if sale_subscription_id is not None:
+                        record['sale_subscription_id'] = sale_subscription_id
+                        mapped_count += 1
+                        logger.debug("  [MAPEO M2O] contract_id v13[%s] -> sale_subscription_id v18[%s]", contract_id, sale_subscription_id)
+                    else:
+                        logger.warning("  ⚠ [MAPEO M2O] contract_id v13[%s] no encontrado en mapeo de sale.subscription", contract_id)
+                        not_mapped_count += 1
+                        # Si no hay mapeo, establecer False para evitar errores
+                        record['sale_subscription_id'] = False
+                if subscription_mapping:
+                    logger.info("[MAPEO M2O] ✓ Mapeados %s campos contract_id -> sale_subscription_id, %s sin mapeo", mapped_count, not_mapped_count)
                 
                 # Eliminar contract_id de many2one_fields para que no se procese como campo normal
-                if 'contract_id' in many2one_fields:
-                    del many2one_fields['contract_id']
-                    logger.debug(f"[MAPEO M2O] Excluyendo contract_id de sale.subscription.line (ya mapeado a sale_subscription_id)")
+                if many2one_fields.pop('contract_id', None) is not None:
+                    logger.debug("[MAPEO M2O] Excluyendo contract_id de sale.subscription.line (ya mapeado a sale_subscription_id)")
         
         if not many2one_fields:
             return records
@@ -3771,64 +4052,64 @@ class MigrationScript:
         mappings = {}
         mapping_stats = {}  # Para diagnóstico
         
-        logger.info(f"[MAPEO M2O] Modelo: {model}, Campos many2one encontrados: {list(many2one_fields.keys())}")
+        logger.info("[MAPEO M2O] Modelo: %s, Campos many2one encontrados: %s", model, list(many2one_fields.keys()))
         
-        # Campos especiales que deben mapearse aunque el modelo relacionado no esté en models_list
-        # Estos son campos requeridos en v18 que deben mapearse desde v13
-        special_fields = {
-            'sale.subscription': ['partner_id', 'company_id', 'pricelist_id'],
-        }
+        # models_list es una lista: pruebas de pertenencia contra un set (una por campo)
+        models_set = frozenset(models_list)
         
-        special_models = {
-            'partner_id': 'res.partner',
-            'company_id': 'res.company',
-            'pricelist_id': 'product.pricelist',
-        }
+        # Cargar en una sola consulta los mapeos de todos los modelos relacionados que se usarán
+        # abajo (campos especiales, user_id -> res.users en res.partner y modelos en models_list)
+        self._prefetch_mappings({
+            _SPECIAL_M2O_RELATIONS.get((model, field_name), relation_model)
+            for field_name, relation_model in many2one_fields.items()
+            if (model, field_name) in _SPECIAL_M2O_RELATIONS
+            or relation_model in models_set
+            or (field_name == 'user_id' and model == 'res.partner' and relation_model == 'res.users')
+        })
         
         for field_name, relation_model in many2one_fields.items():
-            # Verificar si es un campo especial que debe mapearse aunque no esté en models_list
-            is_special_field = False
-            if model in special_fields and field_name in special_fields[model]:
-                is_special_field = True
-                # Obtener el modelo relacionado correcto
-                if field_name in special_models:
-                    relation_model = special_models[field_name]
+            # Campo especial que debe mapearse aunque no esté en models_list (ver _SPECIAL_M2O_RELATIONS):
+            # una sola búsqueda por (modelo, campo) que además da el modelo relacionado correcto
+            special_relation = _SPECIAL_M2O_RELATIONS.get((model, field_name))
+            is_special_field = special_relation is not None
+            if is_special_field:
+                relation_model = special_relation
             
             # EXCEPCIÓN: user_id en res.partner NO debe requerir mapeo de res.users
             # Si res.users no está en models_list, establecer user_id=False directamente sin intentar mapear
             if field_name == 'user_id' and model == 'res.partner' and relation_model == 'res.users':
-                if relation_model not in models_list:
-                    logger.info(f"[MAPEO M2O] Campo user_id en res.partner -> res.users no está en models_list, se establecerá a False si no tiene mapeo")
+                if relation_model not in models_set:
+                    logger.info("[MAPEO M2O] Campo user_id en res.partner -> res.users no está en models_list, se establecerá a False si no tiene mapeo")
                     # Intentar obtener mapeo, pero si no existe, se establecerá a False más adelante
-                    mapping = self.v18_conn.get_migration_mapping(relation_model)
+                    mapping = self._get_cached_mapping(relation_model)
                     if mapping:
                         mappings[field_name] = {
                             'model': relation_model,
                             'mapping': mapping
                         }
-                        logger.info(f"[MAPEO M2O] ✓ Mapeo cargado para {field_name} -> {relation_model}: {len(mapping)} registros")
+                        logger.info("[MAPEO M2O] ✓ Mapeo cargado para %s -> %s: %s registros", field_name, relation_model, len(mapping))
                     else:
-                        logger.info(f"[MAPEO M2O] No hay mapeo para {field_name} -> {relation_model}, se establecerá a False en res.partner")
+                        logger.info("[MAPEO M2O] No hay mapeo para %s -> %s, se establecerá a False en res.partner", field_name, relation_model)
                         # No agregar a mappings, se establecerá a False más adelante
-                elif relation_model in models_list:
+                elif relation_model in models_set:
                     # res.users está en models_list, mapear normalmente
-                    logger.info(f"[MAPEO M2O] Obteniendo mapeo para {field_name} -> {relation_model}...")
-                    mapping = self.v18_conn.get_migration_mapping(relation_model)
+                    logger.info("[MAPEO M2O] Obteniendo mapeo para %s -> %s...", field_name, relation_model)
+                    mapping = self._get_cached_mapping(relation_model)
                     if mapping:
                         mappings[field_name] = {
                             'model': relation_model,
                             'mapping': mapping
                         }
-                        logger.info(f"[MAPEO M2O] ✓ Mapeo cargado para {field_name} -> {relation_model}: {len(mapping)} registros")
+                        logger.info("[MAPEO M2O] ✓ Mapeo cargado para %s -> %s: %s registros", field_name, relation_model, len(mapping))
                     else:
-                        logger.warning(f"[MAPEO M2O] ⚠ No se encontró mapeo para {field_name} -> {relation_model} en migration.tracking")
-            elif relation_model in models_list or is_special_field:
+                        logger.warning("[MAPEO M2O] ⚠ No se encontró mapeo para %s -> %s en migration.tracking", field_name, relation_model)
+            elif relation_model in models_set or is_special_field:
                 if is_special_field:
-                    logger.info(f"[MAPEO M2O] Campo especial {field_name} -> {relation_model} (requerido en {model}, mapeando aunque no esté en models_list)...")
+                    logger.info("[MAPEO M2O] Campo especial %s -> %s (requerido en %s, mapeando aunque no esté en models_list)...", field_name, relation_model, model)
                 else:
-                    logger.info(f"[MAPEO M2O] Obteniendo mapeo para {field_name} -> {relation_model}...")
+                    logger.info("[MAPEO M2O] Obteniendo mapeo para %s -> %s...", field_name, relation_model)
                 
-                mapping = self.v18_conn.get_migration_mapping(relation_model)
+                mapping = self._get_cached_mapping(relation_model)
                 if mapping:
                     mappings[field_name] = {
                         'model': relation_model,
@@ -3838,200 +4119,227 @@ class MigrationScript:
                     mapping_stats[field_name] = {
                         'relation_model': relation_model,
                         'total_mapped': len(mapping),
-                        'sample_mappings': dict(list(mapping.items())[:5])  # Primeros 5 para diagnóstico
+                        'sample_mappings': dict(islice(mapping.items(), 5))  # Primeros 5 para diagnóstico
                     }
-                    logger.info(f"[MAPEO M2O] ✓ Mapeo cargado para {field_name} -> {relation_model}: {len(mapping)} registros")
+                    logger.info("[MAPEO M2O] ✓ Mapeo cargado para %s -> %s: %s registros", field_name, relation_model, len(mapping))
                 else:
-                    logger.warning(f"[MAPEO M2O] ⚠ No se encontró mapeo para {field_name} -> {relation_model} en migration.tracking")
+                    logger.warning("[MAPEO M2O] ⚠ No se encontró mapeo para %s -> %s en migration.tracking", field_name, relation_model)
                     mapping_stats[field_name] = {
                         'relation_model': relation_model,
                         'total_mapped': 0,
                         'error': 'No se encontró mapeo en migration.tracking'
                     }
             else:
-                logger.debug(f"[MAPEO M2O] Campo {field_name} -> {relation_model} no está en models_list, omitiendo")
+                logger.debug("[MAPEO M2O] Campo %s -> %s no está en models_list, omitiendo", field_name, relation_model)
         
-        # Guardar estadísticas de mapeo en archivo de diagnóstico
+        # Acumular estadísticas de mapeo para el archivo de diagnóstico
         if mapping_stats:
-            self._save_mapping_diagnostics(model, mapping_stats)
+            self._pending_mapping_stats.setdefault(model, {}).update(mapping_stats)
         
         if not mappings:
-            logger.warning(f"[MAPEO M2O] ⚠ No hay mapeos disponibles para {model}, los campos many2one no se mapearán")
+            logger.warning("[MAPEO M2O] ⚠ No hay mapeos disponibles para %s, los campos many2one no se mapearán", model)
             return records
         
-        # Mapear IDs en los registros
-        # Primero, identificar partners no mapeados para res.users y crearlos en batch
-        partners_to_create = {}  # {v13_partner_id: login} para evitar duplicados
-        
-        if model == 'res.users' and 'partner_id' in mappings:
-            # Recopilar todos los partner_ids no mapeados y sus logins correspondientes
-            for idx, record in enumerate(records):
-                partner_id = record.get('partner_id')
-                if partner_id:
-                    # Extraer el ID del partner
-                    if isinstance(partner_id, (list, tuple)) and len(partner_id) > 0:
-                        v13_partner_id = partner_id[0]
-                    elif isinstance(partner_id, (int, str)):
-                        v13_partner_id = int(partner_id) if isinstance(partner_id, str) else partner_id
-                    else:
-                        continue
-                    
-                    # Verificar si está mapeado
-                    v13_partner_id_str = str(v13_partner_id)
-                    if v13_partner_id_str not in mappings['partner_id']['mapping']:
-                        # No está mapeado, agregar a la lista para crear
-                        # Usar login si existe, sino usar name, sino usar un nombre genérico
-                        login = record.get('login', '')
-                        name = record.get('name', '')
-                        if login and isinstance(login, str) and login.strip():
-                            partner_name = login.strip()
-                        elif name and isinstance(name, str) and name.strip():
-                            partner_name = name.strip()
-                        else:
-                            partner_name = f"Partner {v13_partner_id}"
-                        
-                        if v13_partner_id not in partners_to_create:
-                            partners_to_create[v13_partner_id] = partner_name
-                            logger.debug(f"[MAPEO M2O] Partner {v13_partner_id} será creado con nombre: {partner_name}")
-        
-        # Crear partners no mapeados en batch
-        created_partners = {}  # {v13_partner_id: v18_partner_id}
-        if partners_to_create:
-            logger.info(f"[MAPEO M2O] Creando {len(partners_to_create)} res.partner no mapeados para res.users...")
-            partner_records = []
-            partner_v13_ids = []
-            
-            for v13_partner_id, partner_name in partners_to_create.items():
-                partner_records.append({
-                    'name': partner_name,
-                    'is_company': False,
-                    'customer_rank': 0,
-                    'supplier_rank': 0,
-                })
-                partner_v13_ids.append(v13_partner_id)
-                logger.debug(f"[MAPEO M2O] Preparando partner: v13_id={v13_partner_id}, name={partner_name}")
-            
-            try:
-                # Crear partners en batch
-                logger.info(f"[MAPEO M2O] Creando {len(partner_records)} partners en batch...")
-                created_partner_ids = self.v18_conn.create('res.partner', partner_records)
-                logger.info(f"[MAPEO M2O] ✓ Partners creados: {len(created_partner_ids)} IDs recibidos")
-                
-                # Registrar en migration.tracking
-                tracking_data = []
-                for v13_partner_id, v18_partner_id in zip(partner_v13_ids, created_partner_ids):
-                    created_partners[v13_partner_id] = v18_partner_id
-                    logger.info(f"[MAPEO M2O] ✓ Partner mapeado: v13_id={v13_partner_id} -> v18_id={v18_partner_id}")
-                    tracking_data.append({
-                        'name': f"res.partner - V13:{v13_partner_id} -> V18:{v18_partner_id} (creado automáticamente para res.users)",
-                        'model_name': 'res.partner',
-                        'v13_id': v13_partner_id,
-                        'v18_id': v18_partner_id,
-                        'status': 'created',
-                    })
-                
-                if tracking_data:
-                    try:
-                        self.v18_conn.models.execute_kw(
-                            self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                            'migration.tracking', 'create',
-                            [tracking_data]
-                        )
-                        logger.info(f"[MAPEO M2O] ✓ Creados {len(created_partners)} res.partner y registrados en migration.tracking")
-                    except Exception as tracking_error:
-                        logger.warning(f"[MAPEO M2O] ⚠ No se pudieron registrar algunos partners en migration.tracking: {tracking_error}")
-            except Exception as partner_error:
-                logger.error(f"[MAPEO M2O] ✗ Error creando res.partner en batch: {partner_error}")
-        
-        # Mapear IDs en los registros
+        # Mapear IDs en los registros (una sola pasada). Los partner_id de res.users sin mapeo se
+        # anotan durante la pasada y se resuelven al final, tras crear en batch los partners que faltan
         mapped_records = []
         mapped_count = 0
         not_mapped_count = 0
-        not_mapped_details = []  # Para diagnóstico
+        not_mapped_details = []  # Para diagnóstico (solo los primeros _UNMAPPED_SAMPLE_SIZE)
+        partners_to_create = {}  # {v13_partner_id: nombre} para evitar duplicados
+        pending_partner_slots = []  # [(registro, v13_partner_id)] a resolver con los partners creados
+        
+        # Campos con mapeo presentes en el batch: se filtran una sola vez (no por registro)
+        # y se enlaza el .get de cada mapeo a un nombre local
+        present_fields = set().union(*records)
+        applicable_mappings = [
+            (field_name, mapping_info['model'], mapping_info['mapping'].get)
+            for field_name, mapping_info in mappings.items()
+            if field_name in present_fields
+        ]
         
         for idx, record in enumerate(records):
-            mapped_record = record.copy()
+            mapped_record = record.copy() if copy else record
             
-            for field_name, mapping_info in mappings.items():
+            for field_name, relation_model, mapping_get in applicable_mappings:
                 if field_name in mapped_record:
                     v13_id = mapped_record[field_name]
                     
-                    # many2one viene como [id, name] en search_read de Odoo
-                    if v13_id and isinstance(v13_id, (list, tuple)) and len(v13_id) > 0:
+                    # many2one viene como [id, name] en search_read de Odoo (caso dominante: un solo test de tipo)
+                    if type(v13_id) is list and v13_id:
                         v13_id_value = v13_id[0]
-                    elif v13_id and isinstance(v13_id, (int, str)):
-                        v13_id_value = int(v13_id) if isinstance(v13_id, str) else v13_id
                     elif v13_id is False or v13_id is None:
                         # Campo vacío, mantener False
                         continue
                     else:
-                        logger.warning(f"[MAPEO M2O] Formato desconocido para {field_name} en registro {idx}: {type(v13_id)} = {v13_id}")
-                        continue
+                        # Tupla, ID directo (int o texto) u otro formato
+                        v13_id_value = _extract_v13_id(v13_id)
+                        if v13_id_value is None:
+                            logger.warning("[MAPEO M2O] Formato desconocido para %s en registro %s: %s = %s", field_name, idx, type(v13_id), v13_id)
+                            continue
                     
-                    v13_id_str = str(v13_id_value)
-                    if v13_id_str in mapping_info['mapping']:
-                        v18_id = mapping_info['mapping'][v13_id_str]
+                    v18_id = mapping_get(v13_id_value)
+                    if v18_id is not None:
                         mapped_record[field_name] = v18_id
                         mapped_count += 1
                         # Log detallado para los primeros registros y campos críticos
                         if idx < 3 or field_name in ['user_id', 'partner_id', 'team_id']:
-                            logger.info(f"[MAPEO M2O] Registro {idx}: {field_name} v13_id={v13_id_value} -> v18_id={v18_id}")
+                            logger.info("[MAPEO M2O] Registro %s: %s v13_id=%s -> v18_id=%s", idx, field_name, v13_id_value, v18_id)
                     else:
                         # IMPORTANTE: user_id en res.partner debe establecerse a False inmediatamente si no hay mapeo
                         # NO debe requerir que res.users esté mapeado
                         if field_name == 'user_id' and model == 'res.partner':
-                            logger.info(f"[MAPEO M2O] user_id={v13_id_value} no tiene mapeo en res.users para res.partner, estableciendo False (no requiere res.users mapeado)")
+                            logger.info("[MAPEO M2O] user_id=%s no tiene mapeo en res.users para res.partner, estableciendo False (no requiere res.users mapeado)", v13_id_value)
                             mapped_record[field_name] = False
                             continue
                         
                         # Si no hay mapeo, verificar si se creó un partner para este caso
                         not_mapped_count += 1
-                        not_mapped_details.append({
-                            'record_idx': idx,
-                            'field_name': field_name,
-                            'v13_id': v13_id_value,
-                            'relation_model': mapping_info['model']
-                        })
+                        if len(not_mapped_details) < _UNMAPPED_SAMPLE_SIZE:
+                            not_mapped_details.append({
+                                'record_idx': idx,
+                                'field_name': field_name,
+                                'v13_id': v13_id_value,
+                                'relation_model': relation_model
+                            })
                         
                         # Caso especial: partner_id en res.users
-                        # Si el partner_id no está mapeado pero se creó un partner, usarlo
+                        # Si el partner_id no está mapeado, se creará un partner (en batch, tras la pasada)
                         if field_name == 'partner_id' and model == 'res.users':
-                            if v13_id_value in created_partners:
-                                new_partner_id = created_partners[v13_id_value]
-                                mapped_record[field_name] = new_partner_id
-                                mapped_count += 1
-                                logger.info(f"[MAPEO M2O] ✓ Usando res.partner creado (ID: {new_partner_id}) para res.users (partner_id v13={v13_id_value})")
-                            else:
-                                # El partner no se pudo crear, establecer False para evitar error
-                                logger.error(f"[MAPEO M2O] ✗ CRÍTICO: partner_id={v13_id_value} no está mapeado y no se creó automáticamente para res.users, estableciendo False")
-                                mapped_record[field_name] = False
+                            if v13_id_value not in partners_to_create:
+                                # Usar login si existe, sino usar name, sino usar un nombre genérico
+                                login = record.get('login', '')
+                                name = record.get('name', '')
+                                if login and isinstance(login, str) and login.strip():
+                                    partner_name = login.strip()
+                                elif name and isinstance(name, str) and name.strip():
+                                    partner_name = name.strip()
+                                else:
+                                    partner_name = f"Partner {v13_id_value}"
+                                partners_to_create[v13_id_value] = partner_name
+                                logger.debug("[MAPEO M2O] Partner %s será creado con nombre: %s", v13_id_value, partner_name)
+                            pending_partner_slots.append((mapped_record, v13_id_value))
                         # Para campos críticos (partner_id, company_id) en sale.subscription, no establecer False
                         # porque son requeridos. El error se detectará en prepare_records_for_creation
                         elif model == 'sale.subscription' and field_name in ['partner_id', 'company_id']:
-                            logger.error(f"[MAPEO M2O] ✗ ERROR CRÍTICO: No se encontró mapeo para {field_name}={v13_id_value} (v13) en {mapping_info['model']}. Este campo es requerido en sale.subscription.")
+                            logger.error("[MAPEO M2O] ✗ ERROR CRÍTICO: No se encontró mapeo para %s=%s (v13) en %s. Este campo es requerido en sale.subscription.", field_name, v13_id_value, relation_model)
                             # Dejar el campo con el valor original [id, name] para que prepare_records_for_creation lo maneje
                             # No establecer False porque es requerido
                         # IMPORTANTE: user_id en res.partner debe ser False si no hay mapeo para evitar errores de foreign key
                         elif field_name == 'user_id' and model == 'res.partner':
-                            logger.warning(f"[MAPEO M2O] ⚠ CRÍTICO: No se encontró mapeo para user_id={v13_id_value} (v13) en res.users para res.partner, estableciendo False para evitar error de foreign key")
+                            logger.warning("[MAPEO M2O] ⚠ CRÍTICO: No se encontró mapeo para user_id=%s (v13) en res.users para res.partner, estableciendo False para evitar error de foreign key", v13_id_value)
                             mapped_record[field_name] = False
                         else:
                             # Para otros casos, poner False (sin relación)
-                            logger.warning(f"[MAPEO M2O] ⚠ No se encontró mapeo para {field_name}={v13_id_value} (v13) en {mapping_info['model']}, estableciendo False")
+                            logger.warning("[MAPEO M2O] ⚠ No se encontró mapeo para %s=%s (v13) en %s, estableciendo False", field_name, v13_id_value, relation_model)
                             mapped_record[field_name] = False
             
             mapped_records.append(mapped_record)
         
+        # Crear partners no mapeados en batch y asignarlos a los res.users anotados
+        created_partners = self._create_missing_partners(partners_to_create) if partners_to_create else {}
+        for mapped_record, v13_partner_id in pending_partner_slots:
+            new_partner_id = created_partners.get(v13_partner_id)
+            if new_partner_id is not None:
+                mapped_record['partner_id'] = new_partner_id
+                mapped_count += 1
+                logger.info("[MAPEO M2O] ✓ Usando res.partner creado (ID: %s) para res.users (partner_id v13=%s)", new_partner_id, v13_partner_id)
+            else:
+                # El partner no se pudo crear, establecer False para evitar error
+                logger.error("[MAPEO M2O] ✗ CRÍTICO: partner_id=%s no está mapeado y no se creó automáticamente para res.users, estableciendo False", v13_partner_id)
+                mapped_record['partner_id'] = False
+        
         if mapped_count > 0:
-            logger.info(f"[MAPEO M2O] ✓ Mapeados {mapped_count} campos many2one")
+            logger.info("[MAPEO M2O] ✓ Mapeados %s campos many2one", mapped_count)
         
         if not_mapped_count > 0:
-            logger.warning(f"[MAPEO M2O] ⚠ {not_mapped_count} campos many2one no pudieron ser mapeados (establecidos a False)")
-            # Guardar detalles de no mapeados en archivo de diagnóstico
-            self._save_unmapped_details(model, not_mapped_details)
+            logger.warning("[MAPEO M2O] ⚠ %s campos many2one no pudieron ser mapeados (establecidos a False)", not_mapped_count)
+            # Acumular detalles de no mapeados para el archivo de diagnóstico
+            sampled = self._pending_unmapped_details.setdefault(model, [])
+            sampled.extend(not_mapped_details[:_UNMAPPED_SAMPLE_SIZE - len(sampled)])
+            self._pending_unmapped_counts[model] = self._pending_unmapped_counts.get(model, 0) + not_mapped_count
+        
+        # Agregar los partners creados al mapeo en caché (en lugar de volver a consultarlo)
+        if created_partners and 'res.partner' in self._mapping_cache:
+            self._mapping_cache['res.partner'].update(created_partners)
         
         return mapped_records
     
+    def _create_missing_partners(self, partners_to_create: Dict[int, str]) -> Dict[int, int]:
+        """
+        Crea en batch los res.partner que faltan para res.users y los registra en migration.tracking.
+        
+        Args:
+            partners_to_create: Diccionario {v13_partner_id: nombre del partner}
+        
+        Returns:
+            Diccionario {v13_partner_id: v18_partner_id} de los partners creados ({} si falló)
+        """
+        created_partners = {}  # {v13_partner_id: v18_partner_id}
+        logger.info("[MAPEO M2O] Creando %s res.partner no mapeados para res.users...", len(partners_to_create))
+        partner_v13_ids = list(partners_to_create)
+        partner_records = [
+            {
+                'name': partner_name,
+                'is_company': False,
+                'customer_rank': 0,
+                'supplier_rank': 0,
+            }
+            for partner_name in partners_to_create.values()
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            for v13_partner_id, partner_name in partners_to_create.items():
+                logger.debug("[MAPEO M2O] Preparando partner: v13_id=%s, name=%s", v13_partner_id, partner_name)
+        
+        try:
+            # Crear partners en batch
+            logger.info("[MAPEO M2O] Creando %s partners en batch...", len(partner_records))
+            created_partner_ids = self.v18_conn.create('res.partner', partner_records)
+            logger.info("[MAPEO M2O] ✓ Partners creados: %s IDs recibidos", len(created_partner_ids))
+            
+            created_partners.update(zip(partner_v13_ids, created_partner_ids))
+            for v13_partner_id, v18_partner_id in created_partners.items():
+                logger.info("[MAPEO M2O] ✓ Partner mapeado: v13_id=%s -> v18_id=%s", v13_partner_id, v18_partner_id)
+            
+            # Registrar en migration.tracking (dicts planos: se envían tal cual por XML-RPC)
+            tracking_data = [
+                {
+                    'name': f"res.partner - V13:{v13_partner_id} -> V18:{v18_partner_id} (creado automáticamente para res.users)",
+                    'model_name': 'res.partner',
+                    'v13_id': v13_partner_id,
+                    'v18_id': v18_partner_id,
+                    'status': 'created',
+                }
+                for v13_partner_id, v18_partner_id in created_partners.items()
+            ]
+            
+            if tracking_data:
+                try:
+                    self.v18_conn.models.execute_kw(
+                        self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
+                        'migration.tracking', 'create',
+                        [tracking_data]
+                    )
+                    logger.info("[MAPEO M2O] ✓ Creados %s res.partner y registrados en migration.tracking", len(created_partners))
+                except Exception as tracking_error:
+                    logger.warning("[MAPEO M2O] ⚠ No se pudieron registrar algunos partners en migration.tracking: %s", tracking_error)
+        except Exception as partner_error:
+            logger.error("[MAPEO M2O] ✗ Error creando res.partner en batch: %s", partner_error)
+        return created_partners
+    
+    def _flush_mapping_diagnostics(self):
+        """
+        Escribe en disco los diagnósticos de mapeo acumulados por map_many2one_ids
+        (un archivo por modelo al final de la migración, en lugar de uno por batch).
+        """
+        pending_stats, self._pending_mapping_stats = self._pending_mapping_stats, {}
+        pending_unmapped, self._pending_unmapped_details = self._pending_unmapped_details, {}
+        pending_counts, self._pending_unmapped_counts = self._pending_unmapped_counts, {}
+        for model, mapping_stats in pending_stats.items():
+            self._save_mapping_diagnostics(model, mapping_stats)
+        for model, not_mapped_details in pending_unmapped.items():
+            self._save_unmapped_details(model, not_mapped_details, pending_counts.get(model))
+    
     def _save_mapping_diagnostics(self, model: str, mapping_stats: Dict):
         """
         Guarda estadísticas de mapeo en un archivo JSON para diagnóstico.
@@ -4059,37 +4367,64 @@ class MigrationScript:
         except Exception as e:
             logger.warning(f"[DIAGNÓSTICO] No se pudo guardar estadísticas de mapeo: {e}")
     
-    def _save_unmapped_details(self, model: str, not_mapped_details: List[Dict]):
+    def _save_unmapped_details(self, model: str, not_mapped_details: List[Dict], total_unmapped: int = None):
         """
         Guarda detalles de campos many2one que no pudieron ser mapeados.
         
+        Los detalles se añaden a unmapped_<modelo>.jsonl (un JSON por línea) y los
+        totales se mantienen en el sidecar unmapped_<modelo>.meta.json. Ambos se
+        reinician en el primer guardado de cada ejecución (run_started distinto).
+        
         Args:
             model: Nombre del modelo
-            not_mapped_details: Lista de detalles de campos no mapeados
+            not_mapped_details: Lista de detalles de campos no mapeados (puede ser una muestra)
+            total_unmapped: Total de campos no mapeados (por defecto len(not_mapped_details))
         """
         try:
             diagnostics_dir = os.path.join(self.errors_dir, 'mapping_diagnostics')
             os.makedirs(diagnostics_dir, exist_ok=True)
             
-            unmapped_file = os.path.join(diagnostics_dir, f"unmapped_{model.replace('.', '_')}.json")
-            
-            # Cargar datos existentes o crear nuevo
-            if os.path.exists(unmapped_file):
-                with open(unmapped_file, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            else:
-                existing_data = {
+            base_name = f"unmapped_{model.replace('.', '_')}"
+            unmapped_file = os.path.join(diagnostics_dir, f"{base_name}.jsonl")
+            meta_file = os.path.join(diagnostics_dir, f"{base_name}.meta.json")
+            
+            # Solo se lee el sidecar (tamaño constante), nunca los detalles ya escritos
+            meta = None
+            if os.path.exists(meta_file):
+                with open(meta_file, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            # Muestra y total son de la ejecución actual: si el sidecar es de otra, se empieza de cero
+            new_run = meta is None or meta.get('run_started') != self._run_started
+            if new_run:
+                meta = {
                     'model': model,
-                    'unmapped_details': []
+                    'run_started': self._run_started,
+                    'total_unmapped': 0,
+                    'sampled': 0
                 }
             
-            # Agregar nuevos detalles
-            existing_data['unmapped_details'].extend(not_mapped_details)
-            existing_data['last_updated'] = datetime.now().isoformat()
-            existing_data['total_unmapped'] = len(existing_data['unmapped_details'])
-            
-            with open(unmapped_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=2, ensure_ascii=False, default=str)
+            if total_unmapped is None:
+                total_unmapped = len(not_mapped_details)
+            
+            # Añadir los nuevos detalles al JSONL (una línea por detalle) sin superar la muestra
+            room = _UNMAPPED_SAMPLE_SIZE - meta.get('sampled', 0)
+            new_details = not_mapped_details[:room] if room > 0 else []
+            if new_details:
+                payload = ''.join(json.dumps(detail, ensure_ascii=False, default=str) + '\n'
+                                  for detail in new_details)
+                with open(unmapped_file, 'w' if new_run else 'a', encoding='utf-8') as f:
+                    f.write(payload)
+            elif new_run and os.path.exists(unmapped_file):
+                # Descartar los detalles de una ejecución anterior
+                open(unmapped_file, 'w', encoding='utf-8').close()
+            
+            meta['sampled'] = meta.get('sampled', 0) + len(new_details)
+            meta['total_unmapped'] = meta.get('total_unmapped', 0) + total_unmapped
+            meta['last_updated'] = datetime.now().isoformat()
+            
+            payload = json.dumps(meta, indent=2, ensure_ascii=False, default=str)
+            with open(meta_file, 'w', encoding='utf-8') as f:
+                f.write(payload)
             
             logger.debug(f"[DIAGNÓSTICO] Detalles de no mapeados guardados en {unmapped_file}")
         except Exception as e:
@@ -4538,16 +4873,17 @@ class MigrationScript:
         # Guardar en JSON
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+        payload = json.dumps({
+            'relation_table': relation_table,
+            'model1': model1,
+            'model2': model2,
+            'export_date': timestamp,
+            'total_records': len(all_records),
+            'fields': fields,
+            'records': all_records
+        }, **_EXPORT_JSON_KWARGS)
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'relation_table': relation_table,
-                'model1': model1,
-                'model2': model2,
-                'export_date': timestamp,
-                'total_records': len(all_records),
-                'fields': fields,
-                'records': all_records
-            }, f, indent=2, ensure_ascii=False, default=str)
+            f.write(payload)
         
         logger.info(f"[M2M] ✓ Exportados {len(all_records)} registros a {filepath}")
         return filepath
@@ -4603,15 +4939,16 @@ class MigrationScript:
                 logger.error(f"✗ El modelo {v13_model} no existe en v13: {error_str}")
                 logger.warning(f"⚠ Omitiendo migración de {model} (v13: {v13_model}) - no disponible en v13")
                 # Crear archivo vacío para indicar que se intentó pero no existe
+                payload = json.dumps({
+                    'model': model,
+                    'export_date': datetime.now().strftime('%Y%m%d_%H%M%S'),
+                    'total_records': 0,
+                    'fields': [],
+                    'records': [],
+                    'error': f"Modelo no existe en v13: {error_str}"
+                }, indent=2, ensure_ascii=False, default=str)
                 with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'model': model,
-                        'export_date': datetime.now().strftime('%Y%m%d_%H%M%S'),
-                        'total_records': 0,
-                        'fields': [],
-                        'records': [],
-                        'error': f"Modelo no existe en v13: {error_str}"
-                    }, f, indent=2, ensure_ascii=False, default=str)
+                    f.write(payload)
                 logger.info(f"[GUARDADO] Archivo vacío creado en: {filepath}")
                 return None  # Retornar None para indicar que el modelo no existe
             else:
@@ -4670,16 +5007,17 @@ class MigrationScript:
                 logger.error(f"✗ El modelo {v13_model} no existe en v13: {error_str}")
                 logger.warning(f"⚠ Omitiendo migración de {model} (v13: {v13_model}) - no disponible en v13")
                 # Crear archivo vacío para indicar que se intentó pero no existe
+                payload = json.dumps({
+                    'model': model,
+                    'v13_model': v13_model,
+                    'export_date': datetime.now().strftime('%Y%m%d_%H%M%S'),
+                    'total_records': 0,
+                    'fields': fields if 'fields' in locals() else [],
+                    'records': [],
+                    'error': f"Modelo no existe en v13: {error_str}"
+                }, indent=2, ensure_ascii=False, default=str)
                 with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'model': model,
-                        'v13_model': v13_model,
-                        'export_date': datetime.now().strftime('%Y%m%d_%H%M%S'),
-                        'total_records': 0,
-                        'fields': fields if 'fields' in locals() else [],
-                        'records': [],
-                        'error': f"Modelo no existe en v13: {error_str}"
-                    }, f, indent=2, ensure_ascii=False, default=str)
+                    f.write(payload)
                 logger.info(f"[GUARDADO] Archivo vacío creado en: {filepath}")
                 return None  # Retornar None para indicar que el modelo no existe
             else:
@@ -4692,14 +5030,15 @@ class MigrationScript:
         logger.info("[GUARDADO] Guardando datos en archivo JSON...")
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+        payload = json.dumps({
+            'model': model,
+            'export_date': timestamp,
+            'total_records': len(all_records),
+            'fields': fields,
+            'records': all_records
+        }, **_EXPORT_JSON_KWARGS)
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'model': model,
-                'export_date': timestamp,
-                'total_records': len(all_records),
-                'fields': fields,
-                'records': all_records
-            }, f, indent=2, ensure_ascii=False, default=str)
+            f.write(payload)
         
         logger.info(f"[GUARDADO] ✓ Datos guardados en: {filepath}")
         logger.info("=" * 80)
@@ -4741,7 +5080,7 @@ class MigrationScript:
                 }
         
         # Verificar y crear etiqueta "OLDv13" antes de migrar productos
-        if model in ['product.template', 'product.product']:
+        if model in _PRODUCT_MODELS:
             if self.oldv13_tag_id is None:
                 logger.info("[VERIFICACIÓN] Verificando/creando etiqueta 'OLDv13' para productos...")
                 self.oldv13_tag_id = self.get_or_create_oldv13_tag()
@@ -5102,7 +5441,7 @@ class MigrationScript:
                     new_mapping = self.v18_conn.get_migration_mapping('uom.category')
                     if new_mapping:
                         # Actualizar el mapeo existente con los nuevos valores
-                        self.uom_category_mapping.update(new_mapping)
+                        self.uom_category_mapping.update(_int_keys(new_mapping))
                         logger.info(f"[ACTUALIZACIÓN] ✓ Mapeo de categorías UoM actualizado: {len(self.uom_category_mapping)} mapeos totales")
                     else:
                         logger.warning("[ACTUALIZACIÓN] ⚠ No se encontró mapeo de categorías UoM en migration.tracking")
@@ -5209,7 +5548,7 @@ class MigrationScript:
                 new_mapping = self.v18_conn.get_migration_mapping('uom.category')
                 if new_mapping:
                     # Actualizar el mapeo existente con los nuevos valores
-                    self.uom_category_mapping.update(new_mapping)
+                    self.uom_category_mapping.update(_int_keys(new_mapping))
                     logger.info(f"[ACTUALIZACIÓN] ✓ Mapeo de categorías UoM actualizado: {len(self.uom_category_mapping)} mapeos totales")
                 else:
                     logger.warning("[ACTUALIZACIÓN] ⚠ No se encontró mapeo de categorías UoM en migration.tracking")
@@ -5250,7 +5589,7 @@ class MigrationScript:
                 tracking_mapping = self.v18_conn.get_migration_mapping('uom.category')
                 if tracking_mapping:
                     # Actualizar el mapeo existente con los nuevos valores
-                    self.uom_category_mapping.update(tracking_mapping)
+                    self.uom_category_mapping.update(_int_keys(tracking_mapping))
                     logger.info(f"[ACTUALIZACIÓN] ✓ Mapeo de categorías UoM actualizado: {len(self.uom_category_mapping)} mapeos totales")
                 else:
                     logger.warning("[ACTUALIZACIÓN] ⚠ No se encontró mapeo de categorías UoM en migration.tracking")
@@ -5262,7 +5601,7 @@ class MigrationScript:
         if model == 'sale.subscription' and not self.pricelist_mapping:
             logger.info("[ACTUALIZACIÓN] Cargando mapeo de product.pricelist desde migration.tracking...")
             try:
-                self.pricelist_mapping = self.v18_conn.get_migration_mapping('product.pricelist')
+                self.pricelist_mapping = _int_keys(self.v18_conn.get_migration_mapping('product.pricelist'))
                 if self.pricelist_mapping:
                     logger.info(f"[ACTUALIZACIÓN] ✓ Mapeo de product.pricelist cargado: {len(self.pricelist_mapping)} mapeos totales")
                 else:
@@ -5297,10 +5636,15 @@ class MigrationScript:
         phase_text = f" ({phase})" if phase else ""
         logger.info(f"[CREACIÓN{phase_text}] Total de batches: {total_batches} (tamaño: {batch_size} registros por batch)")
         
+        # Mapeos de migration.tracking memoizados durante esta migración (ver _get_cached_mapping)
+        self._mapping_cache.clear()
+        
         for i in range(0, len(records_to_migrate), batch_size):
             batch_num = (i // batch_size) + 1
             batch_records = records_to_migrate[i:i + batch_size]
             batch_v13_ids = v13_ids[i:i + batch_size]
+            # El mapeo del propio modelo crece con cada batch creado (ej: parent_id): recargarlo
+            self._mapping_cache.pop(model, None)
             
             logger.info(f"[CREACIÓN{phase_text}] Batch {batch_num}/{total_batches} en proceso ({len(batch_records)} registros)...")
             
@@ -5358,33 +5702,30 @@ class MigrationScript:
             logger.info(f"[PREPARACIÓN{phase_text}] Preparando registros para creación en batch {batch_num}/{total_batches}...")
             prepared_data = self.prepare_records_for_creation(batch_records, model, models_list)
             
-            # Extraer registros preparados y campos many2many
+            # Extraer registros preparados y campos many2many (se consumen a medida que se preparan)
             batch_records_prepared = []
             batch_m2m_data = []  # Lista de dicts con v13_id y m2m_fields
             batch_uom_name_changes = []  # Lista de cambios de nombre de uom para registrar
             
             for prep_data in prepared_data:
-                record = prep_data['record']
+                record = prep_data.record
                 batch_records_prepared.append(record)
                 
                 # Extraer cambios de nombre de uom si existen
-                if '_uom_name_changes' in record:
-                    for change in record['_uom_name_changes']:
-                        batch_uom_name_changes.append({
-                            'v13_id': change['v13_id'],
-                            'v18_id': change['v18_id'],
-                            'v13_name': change['v13_name'],
-                            'v18_name': change['v18_name'],
-                            'field': change['field'],
-                            'model_v13_id': prep_data.get('v13_id')  # ID del registro que usa esta uom
-                        })
-                    # Eliminar el campo temporal del registro
-                    del record['_uom_name_changes']
+                for change in prep_data.uom_name_changes:
+                    batch_uom_name_changes.append({
+                        'v13_id': change['v13_id'],
+                        'v18_id': change['v18_id'],
+                        'v13_name': change['v13_name'],
+                        'v18_name': change['v18_name'],
+                        'field': change['field'],
+                        'model_v13_id': prep_data.v13_id  # ID del registro que usa esta uom
+                    })
                 
-                if prep_data.get('m2m_fields'):
+                if prep_data.m2m_fields:
                     batch_m2m_data.append({
-                        'v13_id': prep_data.get('v13_id'),
-                        'm2m_fields': prep_data['m2m_fields']
+                        'v13_id': prep_data.v13_id,
+                        'm2m_fields': prep_data.m2m_fields
                     })
             
             batch_records = batch_records_prepared
@@ -5399,7 +5740,7 @@ class MigrationScript:
             
             # VERIFICACIÓN CRÍTICA: Asegurar que todos los registros tengan 'name' válido
             try:
-                v18_model_fields = self.v18_conn.get_fields(model)
+                v18_model_fields = self._get_fields_cached(model)
                 has_name_field = 'name' in v18_model_fields
             except Exception as e:
                 # Si no se pueden obtener campos, asumir que el modelo tiene 'name' si es res.partner
@@ -5413,9 +5754,7 @@ class MigrationScript:
                     record_id = batch_v13_ids[idx] if idx < len(batch_v13_ids) else 'Unknown'
                     
                     # Verificar si name está vacío o no existe
-                    is_name_empty = (name_value is None or 
-                                   name_value is False or 
-                                   (isinstance(name_value, str) and not name_value.strip()))
+                    is_name_empty = _is_empty(name_value)
                     
                     if is_name_empty:
                         # Forzar asignación de name
@@ -5972,6 +6311,7 @@ class MigrationScript:
                             logger.error(f"[ERROR DETALLADO] ... y {len(records_to_log) - 3} registros más (ver archivo errors/errors_{model.replace('.', '_')}.json para detalles completos)")
         
         logger.info(f"[CREACIÓN{phase_text}] ✓ Todos los batches completados")
+        self._flush_mapping_diagnostics()
         return stats
     
     def _wait_for_migration_tracking(self, model: str, v13_ids: List[int], max_attempts: int = 10, wait_seconds: float = 0.5):
@@ -6094,50 +6434,54 @@ class MigrationScript:
         if records_to_update:
             logger.info(f"[M2M BATCH] Aplicando campos many2many a {len(records_to_update)} registros...")
             
-            # Convertir a lista de tuplas (id, values) para write
-            write_data = []
+            # Agrupar registros con valores many2many idénticos: Odoo permite escribir los mismos
+            # valores en muchos registros con un solo write, así que es un RPC por grupo en lugar
+            # de uno por registro (ej: muchos partners con las mismas categorías)
+            write_groups = {}  # clave de valores -> (values, [v18_ids])
             for v18_id, values in records_to_update.items():
-                write_data.append((v18_id, values))
+                group_key = tuple(sorted((fname, tuple(cmd[0][2])) for fname, cmd in values.items()))
+                write_groups.setdefault(group_key, (values, []))[1].append(v18_id)
             
-            # Aplicar en batches de 100
+            logger.info(f"[M2M BATCH] {len(records_to_update)} registros agrupados en {len(write_groups)} escrituras")
+            
+            # Aplicar en batches de 100 IDs por write
             batch_size = 100
             success_count = 0
             error_count = 0
             total_relations_applied = 0  # Contar relaciones aplicadas exitosamente
             
-            for i in range(0, len(write_data), batch_size):
-                batch = write_data[i:i + batch_size]
-                try:
-                    # Usar write individual para cada registro
-                    for v18_id, values in batch:
-                        try:
-                            # Usar execute_kw directamente para write
-                            self.v18_conn.models.execute_kw(
-                                self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
-                                model, 'write',
-                                [[v18_id], values]
-                            )
-                            success_count += 1
-                            # Contar relaciones aplicadas (sumar todos los IDs en todos los campos)
-                            for field_name, field_value in values.items():
-                                if isinstance(field_value, list) and len(field_value) > 0:
-                                    # field_value es [(6, 0, [ids])]
-                                    if len(field_value) == 3 and field_value[0] == 6:
-                                        ids_list = field_value[2]
-                                        if isinstance(ids_list, list):
-                                            total_relations_applied += len(ids_list)
-                        except Exception as e2:
-                            error_count += 1
-                            logger.error(f"[M2M BATCH] ✗ Error aplicando campos many2many a {model} ID v18={v18_id}: {e2}")
-                            logger.error(f"[M2M BATCH] Valores intentados: {values}")
-                    
-                    logger.info(f"[M2M BATCH] Batch {i//batch_size + 1}: {len(batch)} registros procesados")
-                except Exception as e:
-                    logger.error(f"[M2M BATCH] Error en batch {i//batch_size + 1}: {e}")
-                    error_count += len(batch)
+            for values, group_ids in write_groups.values():
+                # Relaciones por registro: suma de IDs de todos los campos ([(6, 0, [ids])])
+                relations_per_record = sum(len(cmd[0][2]) for cmd in values.values())
+                for i in range(0, len(group_ids), batch_size):
+                    ids_chunk = group_ids[i:i + batch_size]
+                    try:
+                        self.v18_conn.models.execute_kw(
+                            self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
+                            model, 'write',
+                            [ids_chunk, values]
+                        )
+                        success_count += len(ids_chunk)
+                        total_relations_applied += relations_per_record * len(ids_chunk)
+                    except Exception as e:
+                        # Si falla el write agrupado, reintentar registro por registro para aislar el error
+                        logger.warning(f"[M2M BATCH] ⚠ Error en write agrupado de {len(ids_chunk)} registros de {model}, reintentando individualmente: {e}")
+                        for v18_id in ids_chunk:
+                            try:
+                                self.v18_conn.models.execute_kw(
+                                    self.v18_conn.db, self.v18_conn.uid, self.v18_conn.password,
+                                    model, 'write',
+                                    [[v18_id], values]
+                                )
+                                success_count += 1
+                                total_relations_applied += relations_per_record
+                            except Exception as e2:
+                                error_count += 1
+                                logger.error(f"[M2M BATCH] ✗ Error aplicando campos many2many a {model} ID v18={v18_id}: {e2}")
+                                logger.error(f"[M2M BATCH] Valores intentados: {values}")
             
             # Mostrar estadísticas finales
-            logger.info(f"[M2M BATCH] ✓ Completado: {success_count} registros actualizados exitosamente, {error_count} errores de {len(write_data)} totales")
+            logger.info(f"[M2M BATCH] ✓ Completado: {success_count} registros actualizados exitosamente, {error_count} errores de {len(records_to_update)} totales")
             logger.info(f"[M2M BATCH] 📊 Relaciones aplicadas: {total_relations_applied} de {total_expected_relations} esperadas")
             if total_expected_relations > 0:
                 percentage = (total_relations_applied / total_expected_relations) * 100
@@ -6905,6 +7249,8 @@ def main():
                 logger.error(f"[ERROR] ✗ Error migrando {model}: {e}")
                 import traceback
                 traceback.print_exc()
+                # Escribir los diagnósticos de mapeo acumulados antes de la excepción
+                script._flush_mapping_diagnostics()
         
         logger.info("")
         logger.info("=" * 80)